@@ -0,0 +1,193 @@
+# Controle de admissão do /generate-plan.
+# Cada geração ocupa o LLM e a cota da SerpAPI por dezenas de segundos; sem limite,
+# um pico enfileira streams sem fim e a latência de todos desaba. Aqui:
+# - no máximo PLAN_MAX_CONCURRENT gerações ao mesmo tempo;
+# - fila de espera limitada (PLAN_QUEUE_MAX), com timeout (PLAN_QUEUE_TIMEOUT);
+# - token bucket por usuário (PLAN_USER_RATE_PER_MINUTE, rajadas de PLAN_USER_BURST).
+# Quem não cabe é recusado na hora: 429 (limite do usuário) ou 503 (servidor cheio),
+# sempre com Retry-After.
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque
+
+from fastapi import HTTPException, status
+
+PLAN_MAX_CONCURRENT = int(os.getenv("PLAN_MAX_CONCURRENT", "8"))
+PLAN_QUEUE_MAX = int(os.getenv("PLAN_QUEUE_MAX", "32"))
+PLAN_QUEUE_TIMEOUT = float(os.getenv("PLAN_QUEUE_TIMEOUT", "10"))
+PLAN_USER_RATE_PER_MINUTE = float(os.getenv("PLAN_USER_RATE_PER_MINUTE", "6"))
+PLAN_USER_BURST = int(os.getenv("PLAN_USER_BURST", "3"))
+
+# Limite de usuários com bucket em memória (os mais antigos são descartados)
+MAX_TRACKED_USERS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Segundos até o próximo token."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else 60.0
+
+
+def _reject(status_code: int, detail: str, retry_after: float):
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = PLAN_MAX_CONCURRENT, queue_max: int = PLAN_QUEUE_MAX,
+                 queue_timeout: float = PLAN_QUEUE_TIMEOUT, user_rate_per_minute: float = PLAN_USER_RATE_PER_MINUTE,
+                 user_burst: int = PLAN_USER_BURST):
+        self.max_concurrent = max_concurrent
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate_per_minute / 60
+        self.user_burst = user_burst
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # Duração média de uma geração (média móvel), para estimar o Retry-After
+        self._avg_duration = 30.0
+        self.admitted = 0
+        self.queued = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+        self.queue_timeouts = 0
+        # Planos rápidos (sem LLM) servidos fora das vagas de geração
+        self.fast_plans = 0
+
+    def _bucket(self, user: str) -> TokenBucket:
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self._buckets[user] = bucket
+            if len(self._buckets) > MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user)
+        return bucket
+
+    def _estimated_wait(self) -> float:
+        return self._avg_duration * (len(self._waiters) + 1) / self.max_concurrent
+
+    def check_rate(self, user: str) -> TokenBucket:
+        """Consome um token do usuário; 429 se ele passou do limite."""
+        bucket = self._bucket(user)
+        if not bucket.take():
+            self.rate_limited += 1
+            _reject(status.HTTP_429_TOO_MANY_REQUESTS,
+                    "Muitos planos em pouco tempo. Tente novamente em instantes.", bucket.wait_time())
+        return bucket
+
+    def overloaded(self) -> bool:
+        """Todas as vagas ocupadas: um novo pedido teria de esperar na fila."""
+        return self.active >= self.max_concurrent
+
+    async def admit(self, user: str) -> float:
+        """
+        Reserva uma vaga de geração para o usuário (esperando na fila, se preciso).
+        Retorna o instante da admissão, a ser passado para release().
+        Levanta HTTPException 429/503 quando o pedido deve ser recusado.
+        """
+        bucket = self.check_rate(user)
+
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return time.monotonic()
+
+        if len(self._waiters) >= self.queue_max:
+            self.queue_full += 1
+            bucket.refund()
+            _reject(status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "Servidor ocupado. Tente novamente em instantes.", self._estimated_wait())
+
+        # Espera uma vaga: release() entrega a vaga diretamente ao primeiro da fila
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.queue_timeouts += 1
+            bucket.refund()
+            _reject(status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "Servidor ocupado. Tente novamente em instantes.", self._estimated_wait())
+        except asyncio.CancelledError:
+            # Cliente desistiu na fila; se a vaga já tinha sido entregue, devolve
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            raise
+
+        self.admitted += 1
+        return time.monotonic()
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _hand_over(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def release(self, admitted_at: float):
+        duration = time.monotonic() - admitted_at
+        self._avg_duration = 0.9 * self._avg_duration + 0.1 * duration
+        self._hand_over()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": len(self._waiters),
+            "queue_max": self.queue_max,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": {
+                "rate_limited": self.rate_limited,
+                "queue_full": self.queue_full,
+                "queue_timeout": self.queue_timeouts,
+            },
+            "fast_plans": self.fast_plans,
+            "avg_generation_seconds": round(self._avg_duration, 2),
+        }
+
+
+plan_admission = AdmissionController()
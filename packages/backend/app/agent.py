@@ -1,17 +1,30 @@
 # Este arquivo serve para garantir que o 'import app.agent' funcione.
 # Em um cenário real, aqui estaria a definição do seu Agente GenAI.
+from app.tools.dispatch import AGENT_TOOLS
 
 class MockSessionService:
     """Mock para simular o serviço de sessão."""
     async def create_session(self, app_name, user_id, session_id):
         print(f"[MOCK] Sessão criada: {session_id} para {user_id}")
 
+    async def delete_session(self, app_name, user_id, session_id):
+        print(f"[MOCK] Sessão removida: {session_id} de {user_id}")
+
 class MockAgent:
     """Mock para simular o objeto booking_integrator."""
     def __init__(self):
         self.name = "TravelAgentMock"
         self.model = "gemini-pro"
+        # Ferramentas do agent.yaml (versões assíncronas): chamadas do mesmo turno rodam em paralelo
+        self.tools = AGENT_TOOLS
+        # O Runner percorre os sub-agentes ao fechar (Runner.close)
+        self.sub_agents = []
 
 # Instâncias exportadas que o plan.py espera encontrar
-session_service = MockSessionService()
+try:
+    # Sessões em memória com TTL e limite de tamanho (precisa do SDK do ADK)
+    from app.sessions import BoundedSessionService
+    session_service = BoundedSessionService()
+except ImportError:
+    session_service = MockSessionService()
 booking_integrator = MockAgent()
\ No newline at end of file
@@ -1,29 +1,33 @@
+import os
+import time
+import hashlib
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import database, models, schemas
+from app.tools.cache import TTLCache, MISSING
+from app.passwords import hash_password, verify_password
 
 # Configurações de Segurança
 SECRET_KEY = "SUA_CHAVE_SECRETA_MUITO_SEGURA_AQUI"  # Em produção, use env var!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Cache de identidade: token já verificado -> email (até o token expirar)
+# e email -> usuário (LRU com TTL curto, invalidado explicitamente quando o usuário muda)
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "2048"))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+principal_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES)
+
 # Router de autenticação
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,45 +38,100 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def _token_key(token: str) -> tuple:
+    # Não guardamos o token em si na memória, só o hash
+    return ("token", hashlib.sha256(token.encode()).hexdigest())
+
+def _decode_token(token: str) -> Optional[str]:
+    """Valida o JWT e retorna o email (sub). O resultado fica memorizado até o 'exp' do token."""
+    key = _token_key(token)
+    cached = principal_cache.get(key)
+    if cached is not MISSING:
+        email, exp = cached
+        # O cache nunca pode durar mais que o próprio token
+        if exp > time.time():
+            return email
+        principal_cache.delete(key)
+        return None
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email_payload = payload.get("sub")
+    if email_payload is None:
+        return None
+
+    email = schemas.TokenData(email=str(email_payload)).email
+    # 'exp' é um timestamp UTC: comparar com time.time(), nunca com um datetime sem fuso
+    exp = payload.get("exp", 0)
+    remaining = exp - time.time()
+    if remaining > 0:
+        principal_cache.set(key, (email, exp), remaining)
+    return email
+
+async def _load_user(email: str) -> Optional[models.User]:
+    """Consulta o usuário numa sessão própria (o objeto fica em cache depois que ela fecha)."""
+    async with database.SessionLocal() as db:
+        return await get_user_by_email(db, email)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def save_user(db: AsyncSession, user: models.User) -> models.User:
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+def invalidate_user(email: str):
+    """Remove o usuário do cache (chamar sempre que os dados dele mudarem)."""
+    principal_cache.delete(("user", email))
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email_payload = payload.get("sub")
-        if email_payload is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=str(email_payload))
-    except JWTError:
+    email = _decode_token(token)
+    if email is None:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
-    if user is None:
-        raise credentials_exception
+    user = principal_cache.get(("user", email))
+    if user is MISSING:
+        user = await _load_user(email)
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(("user", email), user, AUTH_USER_CACHE_TTL)
     return user
 
 @router.post("/register")
-def register(user_data: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+async def register(user_data: schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = models.User(email=user_data.email, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await save_user(db, new_user)
+    invalidate_user(new_user.email)
     return {"message": "User registered successfully", "email": new_user.email}
 
 @router.post("/login", response_model=schemas.Token)
-def login(credentials: schemas.UserLogin, db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+async def login(credentials: schemas.UserLogin, db: AsyncSession = Depends(database.get_db)):
+    user = await get_user_by_email(db, credentials.email)
+    valid, new_hash = await verify_password(credentials.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+    if new_hash:
+        # Hash com custo/esquema obsoleto: substitui de forma transparente
+        user.hashed_password = new_hash
+        await save_user(db, user)
+        invalidate_user(user.email)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
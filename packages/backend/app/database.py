@@ -1,7 +1,7 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
 # Garante que as variáveis de ambiente sejam carregadas
@@ -10,23 +10,60 @@ load_dotenv()
 # Pega a URL do arquivo .env. Se não existir, usa SQLite como fallback (segurança)
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./travel.db")
 
-# Configuração do Engine
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    # Configuração específica para SQLite
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    # Configuração para PostgreSQL (e outros bancos reais)
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Configuração do pool de conexões
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _async_url(url: str) -> str:
+    """Troca o driver síncrono pelo assíncrono equivalente (se nenhum driver foi informado)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = _async_url(SQLALCHEMY_DATABASE_URL)
+
+# Configuração do Engine (assíncrono, com pool dimensionado)
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+if "sqlite" in ASYNC_DATABASE_URL:
+    # Configuração específica para SQLite: WAL permite leituras durante uma escrita
+    # e evita que cadastros simultâneos travem uns aos outros
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# expire_on_commit=False: os objetos continuam legíveis depois do commit (sem I/O implícito)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+async def init_db():
+    """Cria as tabelas (chamado uma vez, no startup da aplicação)."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def dispose():
+    await engine.dispose()
@@ -0,0 +1,218 @@
+# Exportação do plano (/download-plan): Markdown -> HTML (markdown-it) -> PDF (WeasyPrint).
+# O layout do PDF leva segundos de CPU, por isso roda num pool de processos próprio e
+# nunca no event loop. Os arquivos gerados ficam num cache pelo hash do conteúdo,
+# limitado em bytes (LRU): baixar o mesmo plano de novo não refaz o PDF, e pedidos
+# iguais em simultâneo partilham uma única renderização (single-flight).
+import os
+import time
+import socket
+import asyncio
+import hashlib
+import ipaddress
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.markdown_stream import make_markdown
+from app.singleflight import SingleFlight
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(2, os.cpu_count() or 1))))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EXPORT_MAX_PLAN_CHARS = int(os.getenv("EXPORT_MAX_PLAN_CHARS", "200000"))
+# Tempo máximo para baixar cada imagem do plano ao montar o PDF
+EXPORT_FETCH_TIMEOUT = int(os.getenv("EXPORT_FETCH_TIMEOUT", "5"))
+# O plano vem do cliente: por padrão o PDF não busca nada na rede (imagens ficam de fora).
+# Com "true", baixa imagens só de endereços públicos (nunca loopback, rede interna etc.)
+EXPORT_REMOTE_IMAGES = os.getenv("EXPORT_REMOTE_IMAGES", "false").lower() in ("1", "true", "yes")
+
+MEDIA_TYPES = {"pdf": "application/pdf", "html": "text/html; charset=utf-8"}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Plano de Viagem</title>
+<style>
+  @page {{ size: A4; margin: 2cm 1.8cm; }}
+  body {{ font-family: "DejaVu Sans", Arial, sans-serif; font-size: 11pt; line-height: 1.5; color: #1f2937; }}
+  h1, h2, h3 {{ color: #0f4c81; line-height: 1.25; }}
+  h2 {{ border-bottom: 1px solid #d1d5db; padding-bottom: 4px; }}
+  a {{ color: #0f4c81; }}
+  img {{ max-width: 100%; border-radius: 6px; }}
+  table {{ border-collapse: collapse; width: 100%; }}
+  th, td {{ border: 1px solid #d1d5db; padding: 4px 8px; text-align: left; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+class ExportUnavailable(Exception):
+    """O formato pedido não pode ser gerado neste servidor (ex.: faltam as bibliotecas do WeasyPrint)."""
+
+
+# Funções executadas nos processos do pool (precisam ser de nível de módulo)
+def _render_html(plan: str) -> bytes:
+    # HTML cru do texto é escapado: o plano vem do cliente
+    body = make_markdown().render(plan)
+    return HTML_TEMPLATE.format(body=body).encode("utf-8")
+
+
+def is_public_url(url: str) -> bool:
+    """http(s) cujo host só resolve para endereços públicos (protege contra SSRF)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+    except (socket.gaierror, UnicodeError, ValueError):
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_global for info in infos)
+
+
+def _render_pdf(plan: str) -> bytes:
+    try:
+        # Import tardio: o WeasyPrint precisa do Pango/GTK instalados no sistema
+        from weasyprint import HTML
+        from weasyprint.urls import URLFetcher
+    except (ImportError, OSError) as e:
+        raise ExportUnavailable(f"WeasyPrint indisponível: {str(e).splitlines()[0]}")
+
+    class PublicURLFetcher(URLFetcher):
+        def fetch(self, url, headers=None):
+            if not EXPORT_REMOTE_IMAGES or not is_public_url(url):
+                raise ValueError(f"Recurso externo recusado: {url}")
+            return super().fetch(url, headers)
+
+    # Só http(s) público e sem redirecionamentos (um redirect poderia levar à rede interna)
+    fetcher = PublicURLFetcher(timeout=EXPORT_FETCH_TIMEOUT, allowed_protocols={"http", "https"}, allow_redirects=False)
+    return HTML(string=_render_html(plan).decode("utf-8"), url_fetcher=fetcher).write_pdf()
+
+
+RENDERERS = {"pdf": _render_pdf, "html": _render_html}
+
+
+class ExportCache:
+    """LRU limitado pelo total de bytes dos arquivos guardados."""
+
+    def __init__(self, max_bytes: int = EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            content = self._data.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def set(self, key: Tuple[str, str], content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = content
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+export_cache = ExportCache()
+export_flight = SingleFlight()
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Motivo de o PDF não estar disponível (descoberto na primeira tentativa)
+_unavailable: dict = {}
+_render_stats = {"renders": 0, "render_seconds": 0.0}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Sem fork (como em app/passwords.py): o processo já tem threads ativas
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def content_hash(plan: str) -> str:
+    return hashlib.sha256(plan.encode("utf-8")).hexdigest()
+
+
+async def export_plan(plan: str, fmt: str = "pdf") -> Tuple[bytes, str]:
+    """
+    Arquivo do plano no formato pedido ('pdf' ou 'html') e o hash do conteúdo (ETag).
+    Levanta ExportUnavailable se o formato não puder ser gerado neste servidor.
+    """
+    if fmt in _unavailable:
+        raise ExportUnavailable(_unavailable[fmt])
+
+    digest = content_hash(plan)
+    key = (fmt, digest)
+    content = export_cache.get(key)
+    if content is not None:
+        return content, digest
+
+    async def render() -> bytes:
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(_get_pool(), RENDERERS[fmt], plan)
+        except ExportUnavailable as e:
+            _unavailable[fmt] = str(e)
+            raise
+        elapsed = time.monotonic() - start
+        _render_stats["renders"] += 1
+        _render_stats["render_seconds"] += elapsed
+        print(f"📄 [LOG] Plano exportado em {fmt.upper()} ({len(result)} bytes, {elapsed:.2f}s)")
+        export_cache.set(key, result)
+        return result
+
+    return await export_flight.do(key, render), digest
+
+
+def stats() -> dict:
+    renders = _render_stats["renders"]
+    return {
+        "cache": export_cache.stats(),
+        "renders": renders,
+        "avg_render_seconds": round(_render_stats["render_seconds"] / renders, 3) if renders else None,
+        "in_flight": export_flight.stats()["in_flight"],
+        "unavailable": dict(_unavailable),
+    }
@@ -0,0 +1,280 @@
+# Plano rápido, sem LLM.
+# Quando o modelo está lento, limitado ou fora do ar, o /generate-plan travava ou
+# terminava em "ERRO INTERNO". Aqui as cinco ferramentas rodam em paralelo (com os
+# mesmos argumentos do pré-carregamento, então cache e single-flight são os mesmos)
+# e o roteiro em Markdown é montado por templates a partir dos registros estruturados:
+# uma rodada de ferramentas, zero tokens. Usado a pedido (planMode="fast"), sob
+# sobrecarga, como reserva quando o agente falha e na prévia anônima (/preview-plan).
+import os
+import asyncio
+from datetime import date
+from typing import AsyncGenerator, Dict, List, Optional
+
+import numpy as np
+
+from app import schemas
+from app.prefetch import DEFAULT_RECOMMENDATION_CATEGORY
+from app.tools.cache import MISSING, tool_cache
+from app.tools.flights import _flights_link, _search_flights
+from app.tools.hotels import HOTEL_SEARCH_PAGES, _hotels_link, _search_hotels
+from app.tools.http import serpapi_meter
+from app.tools.images import _search_images
+from app.tools.ranking import HotelPage, RankingWeights, rank
+from app.tools.recommendations import _maps_link, _search_recommendations
+from app.tools.resilience import with_deadline
+from app.tools.results import (
+    FlightOffersResult, FlightResult, HotelResult, HotelSuggestionResult, ImageResult,
+    Link, RecommendationResult, WeatherResult,
+)
+from app.tools.weather import _historical_weather, _weather_link
+
+# Chamadas à SerpAPI por dia para as prévias anônimas (/preview-plan). Esgotado o
+# orçamento, a prévia usa só o que já está no cache das ferramentas
+PREVIEW_SERPAPI_DAILY_BUDGET = int(os.getenv("PREVIEW_SERPAPI_DAILY_BUDGET", "200"))
+# Custo máximo de um plano rápido sem cache: voos (google_flights + busca genérica de
+# reserva), páginas de hotéis (+ sugestões de reserva), recomendações e imagens
+FAST_PLAN_SERPAPI_COST = 2 + (HOTEL_SEARCH_PAGES + 1) + 1 + 1
+
+FOOTER = ("\n---\n_Plano rápido montado diretamente a partir dos dados de voos, hotéis, clima e "
+          "atrações, sem IA. Os preços e a disponibilidade mudam: confirme nos links._\n")
+
+
+def _money(value: float) -> str:
+    # 12345.6 -> "12.346" (separador de milhar à brasileira)
+    return f"{value:,.0f}".replace(",", ".")
+
+
+def _nights(request: schemas.TravelRequest) -> int:
+    try:
+        start = date.fromisoformat(request.departureDate)
+        end = date.fromisoformat(request.returnDate or request.departureDate)
+        return max((end - start).days, 1)
+    except ValueError:
+        return 1
+
+
+class PreviewBudget:
+    """Orçamento diário de chamadas à SerpAPI das prévias (reservado no início, acertado no fim)."""
+
+    def __init__(self, daily: int = PREVIEW_SERPAPI_DAILY_BUDGET):
+        self.daily = daily
+        self._day: Optional[date] = None
+        self.used = 0
+        self.previews = 0
+        self.cache_only = 0
+
+    def _reset(self):
+        today = date.today()
+        if self._day != today:
+            self._day = today
+            self.used = 0
+
+    def reserve(self) -> bool:
+        """Reserva o custo estimado de uma prévia; False se o orçamento do dia acabou."""
+        self._reset()
+        self.previews += 1
+        if self.used + FAST_PLAN_SERPAPI_COST > self.daily:
+            self.cache_only += 1
+            return False
+        self.used += FAST_PLAN_SERPAPI_COST
+        return True
+
+    def settle(self, spent: int):
+        """Troca a reserva pelo gasto real (parte das buscas pode ter vindo do cache)."""
+        self._reset()
+        self.used = max(self.used - FAST_PLAN_SERPAPI_COST + spent, 0)
+
+    def stats(self) -> dict:
+        self._reset()
+        return {"used_today": self.used, "daily": self.daily, "previews": self.previews, "cache_only": self.cache_only}
+
+
+preview_budget = PreviewBudget()
+
+
+async def _from_cache(func, args: tuple):
+    """Resultado só do cache das ferramentas (prévia sem orçamento)."""
+    value = tool_cache.get(func.cache_key(*args))
+    if value is MISSING:
+        raise LookupError("fora do cache")
+    return value
+
+
+def _start_tools(request: schemas.TravelRequest, cache_only: bool = False) -> Dict[str, asyncio.Task]:
+    """As cinco buscas em paralelo, cada uma com o prazo da ferramenta."""
+    return_date = request.returnDate if request.returnDate else request.departureDate
+    jobs = {
+        "flights": (_search_flights, (request.origin, request.destination, request.departureDate, return_date)),
+        "hotels": (_search_hotels, (request.destination, request.departureDate, return_date, request.nightlyBudget)),
+        "weather": (_historical_weather, (request.destination, request.departureDate, return_date)),
+        "recommendations": (_search_recommendations, (request.destination, DEFAULT_RECOMMENDATION_CATEGORY)),
+        "images": (_search_images, (request.destination,)),
+    }
+    return {
+        tool: asyncio.create_task(_from_cache(func, args) if cache_only else with_deadline(tool, func(*args)))
+        for tool, (func, args) in jobs.items()
+    }
+
+
+async def _result(task: asyncio.Task):
+    """Resultado da ferramenta, ou None se ela falhou (a seção fica só com o link)."""
+    try:
+        return await task
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️ [LOG] Plano rápido sem dados de uma ferramenta: {e}")
+        return None
+
+
+# --- Seções ---
+
+def _flights_section(result, link: Link) -> List[str]:
+    lines = ["### ✈️ Voos", ""]
+    if isinstance(result, FlightOffersResult):
+        for offer in result.offers:
+            price = f"R$ {_money(offer.price)}" if offer.price is not None else "preço no link"
+            duration = f"{offer.duration_min // 60}h{offer.duration_min % 60:02d}" if offer.duration_min else "duração no link"
+            stops = "direto" if offer.stops == 0 else f"{offer.stops} escala(s)"
+            lines.append(f"- **{offer.airline}** · {price} · {duration} · {stops} · {offer.departure} → {offer.arrival}")
+        if result.return_date:
+            lines.append("\n_Preços de ida e volta por pessoa._")
+    elif isinstance(result, FlightResult) and result.options:
+        lines += [f"- **{o.title}**: {o.snippet}" for o in result.options]
+    else:
+        lines.append("Não foi possível obter as tarifas agora.")
+    return lines + ["", link.markdown(), ""]
+
+
+def _hotels_section(result, link: Link) -> List[str]:
+    lines = ["### 🏨 Hospedagem", ""]
+    if isinstance(result, HotelResult) and result.hotels:
+        lines += ["| Hotel | Preço/noite | Nota | Avaliações | Distância do centro |", "|---|---|---|---|---|"]
+        lines += [f"| {h.name} | {h.price} | {h.rating} | {h.reviews} | {h.distance} |" for h in result.hotels]
+    elif isinstance(result, HotelSuggestionResult) and result.suggestions:
+        lines += [f"- **{title}**: {snippet}" for title, snippet in result.suggestions]
+    else:
+        lines.append("Não foi possível obter os hotéis agora.")
+    return lines + ["", link.markdown(), ""]
+
+
+def _weather_section(result, link: Link) -> List[str]:
+    lines = ["### 🌦️ Clima", ""]
+    if isinstance(result, WeatherResult):
+        lines.append(f"Temperatura média de **{result.temperature:.1f}°C** e chuva {result.rain} "
+                     f"no período (média dos últimos {result.years} anos).")
+        if result.temperature < 12:
+            lines.append("\nLeve roupas de frio.")
+        elif result.temperature > 26:
+            lines.append("\nRoupas leves, protetor solar e hidratação.")
+    else:
+        lines.append("Não foi possível obter a média histórica agora.")
+    return lines + ["", link.markdown(), ""]
+
+
+def _recommendations_section(result, link: Link) -> List[str]:
+    lines = ["### 🗺️ O que fazer", ""]
+    if isinstance(result, RecommendationResult) and result.items:
+        lines += [f"- **[{i.title}]({i.link.url})**: {i.snippet}" for i in result.items]
+    else:
+        lines.append("Não foi possível obter as recomendações agora.")
+    return lines + ["", link.markdown(), ""]
+
+
+def _budget_section(request: schemas.TravelRequest, flights, page) -> List[str]:
+    nights = _nights(request)
+    lines = ["### 💰 Orçamento estimado", ""]
+    total = 0.0
+
+    prices = [o.price for o in flights.offers if o.price is not None] if isinstance(flights, FlightOffersResult) else []
+    if prices:
+        total += min(prices)
+        lines.append(f"- Passagens: a partir de R$ {_money(min(prices))}")
+    else:
+        lines.append("- Passagens: consulte o link de voos")
+
+    hotel_prices = page.prices[np.isfinite(page.prices)] if isinstance(page, HotelPage) else np.array([])
+    if hotel_prices.size:
+        # Mediana das opções, mais realista que a mais barata
+        nightly = float(np.median(hotel_prices))
+        total += nightly * nights
+        lines.append(f"- Hospedagem: {nights} noite(s) × R$ {_money(nightly)} = R$ {_money(nightly * nights)}")
+    else:
+        lines.append(f"- Hospedagem: até {nights} noite(s) × R$ {_money(request.nightlyBudget)} = "
+                     f"R$ {_money(request.nightlyBudget * nights)}")
+        total += request.nightlyBudget * nights
+
+    lines.append(f"- **Total estimado: R$ {_money(total)}** de R$ {_money(request.totalBudget)}")
+    left = request.totalBudget - total
+    if left >= 0:
+        lines.append(f"- Sobram cerca de R$ {_money(left)} (R$ {_money(left / nights)} por dia) para alimentação, passeios e transporte.")
+    else:
+        lines.append(f"- O estimado passa do orçamento em R$ {_money(-left)}: considere datas flexíveis ou hotéis mais simples.")
+    return lines + [""]
+
+
+# --- Stream ---
+
+async def stream_fast_plan(request: schemas.TravelRequest, cache_only: bool = False) -> AsyncGenerator[str, None]:
+    """
+    Plano em Markdown montado pelas ferramentas, seção a seção, na ordem do roteiro.
+    Com `cache_only`, nenhuma busca externa: só o que já está no cache das ferramentas.
+    """
+    print(f"⚡ [LOG] Plano rápido (sem LLM) para {request.origin} → {request.destination}"
+          f"{' (só cache)' if cache_only else ''}")
+    tasks = _start_tools(request, cache_only)
+    return_date = request.returnDate if request.returnDate else request.departureDate
+    try:
+        # O cabeçalho não depende de nenhuma ferramenta: sai antes de qualquer espera
+        header = [f"# {request.origin} → {request.destination}", "",
+                  f"{request.departureDate} a {return_date} · {_nights(request)} noite(s) · "
+                  f"orçamento de R$ {_money(request.totalBudget)}", ""]
+        if request.preferences:
+            header += [f"_Preferências: {request.preferences}_", ""]
+        yield "\n".join(header) + "\n"
+
+        flights = await _result(tasks["flights"])
+        yield "\n".join(_flights_section(flights, _flights_link(
+            request.origin, request.destination, request.departureDate, return_date))) + "\n"
+
+        page = await _result(tasks["hotels"])
+        hotels = rank(page, RankingWeights.from_dict(request.hotelWeights)) if isinstance(page, HotelPage) else page
+        yield "\n".join(_hotels_section(hotels, _hotels_link(
+            request.destination, request.departureDate, return_date, request.nightlyBudget))) + "\n"
+
+        weather = await _result(tasks["weather"])
+        yield "\n".join(_weather_section(weather, _weather_link(request.destination))) + "\n"
+
+        recommendations = await _result(tasks["recommendations"])
+        yield "\n".join(_recommendations_section(recommendations, _maps_link(
+            request.destination, DEFAULT_RECOMMENDATION_CATEGORY))) + "\n"
+
+        yield "\n".join(_budget_section(request, flights, page)) + "\n"
+
+        images = await _result(tasks["images"])
+        gallery = images.images if isinstance(images, ImageResult) else ()
+        if gallery:
+            yield "\n".join(["### 📸 Galeria", ""] + [image.markdown() for image in gallery]) + "\n"
+
+        yield FOOTER
+    finally:
+        # Cliente desistiu no meio: não deixa buscas soltas
+        for task in tasks.values():
+            task.cancel()
+
+
+async def stream_preview_plan(request: schemas.TravelRequest) -> AsyncGenerator[str, None]:
+    """Plano rápido da prévia anônima, dentro do orçamento diário de SerpAPI."""
+    if not preview_budget.reserve():
+        async for chunk in stream_fast_plan(request, cache_only=True):
+            yield chunk
+        return
+
+    # As tasks das ferramentas herdam o contexto: o medidor conta as chamadas reais
+    meter = [0]
+    serpapi_meter.set(meter)
+    try:
+        async for chunk in stream_fast_plan(request):
+            yield chunk
+    finally:
+        preview_budget.settle(meter[0])
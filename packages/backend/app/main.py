@@ -1,9 +1,20 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app import models, database
+from app import models, database, export
+from app.admission import plan_admission
+from app.agent import session_service
+from app.auth import principal_cache
+from app.fast_plan import preview_budget
+from app.passwords import shutdown_pool
+from app.plan_cache import plan_cache
 from app.routers import auth, plan
+from app.streaming import sse_streams
+from app.warmer import cache_warmer
+from app.tools import http, resilience
+from app.tools.cache import tool_cache, tool_flight
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -15,11 +26,27 @@ if not API_KEY:
 else:
     os.environ["GOOGLE_API_KEY"] = API_KEY
 
-# Inicializa Banco de Dados
-models.Base.metadata.create_all(bind=database.engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Inicializa Banco de Dados (uma vez, no startup)
+    await database.init_db()
+    # Deixa os Runners do agente prontos antes do primeiro pedido
+    if plan.runner_pool:
+        plan.runner_pool.warm()
+    # Renova, fora de pico, o cache das ferramentas para os destinos mais pedidos
+    cache_warmer.start()
+    yield
+    await cache_warmer.stop()
+    if plan.runner_pool:
+        await plan.runner_pool.close()
+    await database.dispose()
+    # Fecha o pool de conexões HTTP compartilhado pelas ferramentas
+    await http.aclose()
+    shutdown_pool()
+    export.shutdown_pool()
 
 # Inicializa App
-app = FastAPI(title="Travel Planner API", version="1.0.0")
+app = FastAPI(title="Travel Planner API", version="1.0.0", lifespan=lifespan)
 
 # Configura CORS
 origins = [
@@ -43,4 +70,22 @@ app.include_router(plan.router)
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "tool_cache": tool_cache.stats(),
+        "tool_singleflight": tool_flight.stats(),
+        "upstreams": resilience.stats(),
+        "plan_singleflight": plan.plan_flight.stats(),
+        "auth_cache": principal_cache.stats(),
+        "plan_cache": plan_cache.stats(),
+        "sse_streams": sse_streams.stats(),
+        "plan_admission": plan_admission.stats(),
+        "export": export.stats(),
+        "warm_cache": cache_warmer.stats(),
+        "preview": preview_budget.stats(),
+        "runner_pool": plan.runner_pool.stats() if plan.runner_pool else None,
+        "sessions": session_service.stats() if hasattr(session_service, "stats") else None,
+    }
\ No newline at end of file
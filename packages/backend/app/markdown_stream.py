@@ -0,0 +1,77 @@
+# Renderização incremental do plano: Markdown em pedaços -> deltas de HTML.
+# No modo "html" do /generate-plan o cliente não precisa reprocessar o documento
+# inteiro a cada pedaço (custo quadrático em roteiros longos): o servidor só emite
+# um bloco (parágrafo, título, lista, tabela...) quando ele fecha, e nunca
+# renderiza de novo um bloco já emitido. O cliente só acrescenta o HTML recebido.
+from typing import AsyncGenerator
+
+import markdown_it
+
+from app.plan_cache import ErrorChunk
+
+
+def make_markdown() -> markdown_it.MarkdownIt:
+    """Parser usado na exportação e no stream. HTML cru no texto é escapado."""
+    return markdown_it.MarkdownIt("commonmark", {"html": False}).enable("table")
+
+
+class IncrementalMarkdown:
+    """
+    Guarda só o texto do bloco ainda aberto. Um bloco de nível superior está fechado
+    quando já existe outro depois dele: o texto novo só pode mudar o último bloco.
+    """
+
+    def __init__(self):
+        self._md = make_markdown()
+        # Definições de referência ([x]: url) valem para os blocos seguintes
+        self._env: dict = {}
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """HTML dos blocos que fecharam com este pedaço (pode ser vazio)."""
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self._pending += text
+        # Um bloco só fecha numa quebra de linha: sem ela nem vale a pena analisar
+        if "\n" not in text:
+            return ""
+
+        # A última linha ainda incompleta fica de fora: "* **" parece um separador (---)
+        # até chegar o resto do negrito
+        complete = self._pending[:self._pending.rfind("\n") + 1]
+        starts = [
+            token.map[0]
+            # Env à parte: uma definição ainda incompleta não pode ficar registrada
+            for token in self._md.parse(complete, {"references": dict(self._env.get("references", {}))})
+            if token.level == 0 and token.map and token.nesting >= 0
+        ]
+        if len(starts) < 2:
+            return ""
+
+        # Tudo antes da primeira linha do último bloco já é definitivo
+        cut = sum(len(line) + 1 for line in complete.split("\n")[:starts[-1]])
+        done, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._md.render(done, self._env)
+
+    def flush(self) -> str:
+        """HTML do que sobrou (fim do stream)."""
+        text, self._pending = self._pending, ""
+        return self._md.render(text, self._env) if text.strip() else ""
+
+
+async def render_html_stream(source: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """Converte um stream de Markdown em deltas de HTML só de acréscimo."""
+    renderer = IncrementalMarkdown()
+    async for chunk in source:
+        if isinstance(chunk, ErrorChunk):
+            # O erro vai à parte (evento 'error'), depois do que já estava pronto
+            html = renderer.flush()
+            if html:
+                yield html
+            yield chunk
+            continue
+        html = renderer.feed(chunk)
+        if html:
+            yield html
+    html = renderer.flush()
+    if html:
+        yield html
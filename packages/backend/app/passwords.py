@@ -0,0 +1,64 @@
+# Hash e verificação de senhas fora do event loop.
+# O bcrypt leva ~100-300 ms de CPU por operação; rodando dentro do handler ele
+# serializa os logins do worker e atrasa os streams de plano que dividem o mesmo
+# processo. Aqui o trabalho vai para um pool de processos do tamanho do número de núcleos.
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Custo do bcrypt (log2 das iterações). Hashes com custo menor são refeitos no próximo login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Sem fork: o processo já tem threads (event loop, loop de fundo do HTTP), e um fork
+        # com threads ativas pode herdar locks presos e travar o filho
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Funções executadas nos processos do pool (precisam ser de nível de módulo)
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha. Retorna (válida, novo_hash): novo_hash vem preenchido quando o hash
+    salvo usa um esquema ou custo obsoleto e deve ser substituído (rehash transparente).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _verify_and_update, password, hashed_password)
@@ -0,0 +1,56 @@
+# Cache de planos completos.
+# Gerar um plano custa vários turnos do LLM e cinco ferramentas externas, e pedidos
+# idênticos (retentativas, clique duplo) são comuns. Gravamos os pedaços do stream
+# sob o hash canônico do TravelRequest e, num pedido igual dentro do TTL, repetimos
+# o stream a partir do cache sem passar pelo Runner.
+import os
+import asyncio
+from typing import AsyncGenerator, Optional, Tuple
+
+from app import schemas
+from app.tools.cache import TTLCache, MISSING
+
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(60 * 60)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "256"))
+# "user": cada usuário só reaproveita os próprios planos; "global": qualquer pedido igual
+PLAN_CACHE_SCOPE = os.getenv("PLAN_CACHE_SCOPE", "user")
+# Intervalo entre pedaços na repetição (0 = tudo de uma vez)
+PLAN_CACHE_REPLAY_DELAY = float(os.getenv("PLAN_CACHE_REPLAY_DELAY", "0"))
+
+plan_cache = TTLCache(maxsize=PLAN_CACHE_MAX_ENTRIES)
+
+
+class ErrorChunk(str):
+    """Pedaço de texto que representa um erro: um stream que emite um destes não vai para o cache."""
+
+
+def plan_cache_key(request: schemas.TravelRequest, user_email: str) -> tuple:
+    if PLAN_CACHE_SCOPE == "global":
+        return ("plan", request.canonical_key())
+    return ("plan", user_email, request.canonical_key())
+
+
+def get_cached_plan(key: tuple) -> Optional[Tuple[str, ...]]:
+    chunks = plan_cache.get(key)
+    return None if chunks is MISSING else chunks
+
+
+async def replay_plan(chunks: Tuple[str, ...]) -> AsyncGenerator[str, None]:
+    print(f"♻️ [LOG] Plano servido do cache ({len(chunks)} pedaços)")
+    for chunk in chunks:
+        yield chunk
+        if PLAN_CACHE_REPLAY_DELAY:
+            await asyncio.sleep(PLAN_CACHE_REPLAY_DELAY)
+
+
+async def record_plan(key: tuple, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """Repassa o stream e, se ele terminar sem erro, guarda os pedaços no cache."""
+    chunks = []
+    failed = False
+    async for chunk in stream:
+        failed = failed or isinstance(chunk, ErrorChunk)
+        chunks.append(chunk)
+        yield chunk
+
+    if chunks and not failed:
+        plan_cache.set(key, tuple(chunks), PLAN_CACHE_TTL)
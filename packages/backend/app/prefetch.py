@@ -0,0 +1,62 @@
+# Pré-carregamento especulativo dos dados das ferramentas.
+# Tudo que o agente precisa já está no TravelRequest, então disparamos as buscas
+# em paralelo assim que a requisição chega. Quando o agente chamar a ferramenta com
+# os mesmos argumentos, o resultado vem do cache ou da busca já em andamento.
+import os
+import asyncio
+from typing import List
+
+from app import schemas
+from app.tools.flights import get_flight_options_async
+from app.tools.hotels import get_hotel_options_async
+from app.tools.images import get_destination_images_async
+from app.tools.recommendations import get_recommendations_async
+from app.tools.weather import get_historical_average_weather_async
+
+PREFETCH_ENABLED = os.getenv("PLAN_PREFETCH", "true").lower() in ("1", "true", "yes")
+
+# Categoria usada no pré-carregamento de recomendações (também sugerida ao agente no prompt)
+DEFAULT_RECOMMENDATION_CATEGORY = "atrações turísticas"
+
+# O event loop só guarda referências fracas das tasks; mantemos as pendentes aqui
+# para que terminem (e preencham o cache) mesmo depois que o stream acabar.
+_running_tasks = set()
+
+
+def should_prefetch(request: schemas.TravelRequest) -> bool:
+    """O campo 'prefetch' da requisição tem prioridade sobre a configuração do servidor."""
+    if request.prefetch is not None:
+        return request.prefetch
+    return PREFETCH_ENABLED
+
+
+def _consume_result(task: asyncio.Task):
+    _running_tasks.discard(task)
+    # Evita o aviso "Task exception was never retrieved"; as ferramentas já logam seus erros
+    if not task.cancelled():
+        task.exception()
+
+
+def start_prefetch(request: schemas.TravelRequest) -> List[asyncio.Task]:
+    """Dispara as cinco ferramentas em paralelo e retorna as tasks (não precisa aguardá-las)."""
+    # A mesma data de volta do prompt (final_return_date): só com argumentos iguais aos do
+    # agente a chave do cache bate e o resultado pré-carregado é reaproveitado
+    return_date = request.returnDate if request.returnDate else request.departureDate
+
+    coros = [
+        get_flight_options_async(request.origin, request.destination, request.departureDate, return_date),
+        get_hotel_options_async(request.destination, request.departureDate, return_date, request.nightlyBudget),
+        get_historical_average_weather_async(request.destination, request.departureDate, return_date),
+        get_recommendations_async(request.destination, DEFAULT_RECOMMENDATION_CATEGORY),
+        get_destination_images_async(request.destination),
+    ]
+
+    tasks = []
+    for coro in coros:
+        task = asyncio.create_task(coro)
+        _running_tasks.add(task)
+        task.add_done_callback(_consume_result)
+        tasks.append(task)
+
+    print(f"⚡ [LOG] Pré-carregamento iniciado para {request.origin} → {request.destination}")
+    return tasks
@@ -1,7 +1,8 @@
-from datetime import datetime
-from typing import AsyncGenerator
-from fastapi import APIRouter, Depends, Response
-from fastapi.responses import StreamingResponse
+import os
+import uuid
+import asyncio
+from typing import AsyncGenerator, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 # Tenta importar o runner, se falhar (sem SDK), evita crash total no import
 try:
     from google.adk.runners import Runner
@@ -11,29 +12,81 @@ except ImportError:
     Runner = None
     types = None
 
-import markdown_it
 
 from app import schemas, auth, models
 # Importa do novo arquivo agent.py que criamos para evitar erro de módulo faltando
 from app.agent import booking_integrator, session_service 
+from app.prefetch import should_prefetch, start_prefetch, DEFAULT_RECOMMENDATION_CATEGORY
+from app.singleflight import StreamFlight
+from app.plan_cache import ErrorChunk, get_cached_plan, plan_cache_key, record_plan, replay_plan
+from app.streaming import sse_response, sse_streams
+from app.runner_pool import RunnerPool
+from app.admission import plan_admission
+from app.warmer import cache_warmer
+from app.markdown_stream import render_html_stream
+from app.fast_plan import stream_fast_plan, stream_preview_plan
+from app.export import EXPORT_MAX_PLAN_CHARS, MEDIA_TYPES, ExportUnavailable, export_plan
+from app.tools.results import LinkResolver, current_links
+from app.tools.ranking import RankingWeights, current_weights
 
 router = APIRouter(tags=["Planning"])
 
+# Requisições idênticas e simultâneas do mesmo usuário compartilham uma única geração (desligado por padrão)
+PLAN_SINGLEFLIGHT = os.getenv("PLAN_SINGLEFLIGHT", "false").lower() in ("1", "true", "yes")
+plan_flight = StreamFlight()
+
+# Sem vaga livre, o modo "auto" responde com o plano rápido (sem LLM) em vez de enfileirar
+PLAN_FAST_ON_OVERLOAD = os.getenv("PLAN_FAST_ON_OVERLOAD", "true").lower() in ("1", "true", "yes")
+
+APP_NAME = "travel_planner"
+# Chave do estado da sessão com os links profundos já registrados (para os ajustes)
+LINKS_STATE_KEY = "plan_links"
+
+# Runners reaproveitados entre requisições (None se o SDK não estiver instalado)
+runner_pool = RunnerPool(
+    lambda: Runner(agent=booking_integrator, app_name=APP_NAME, session_service=session_service)
+) if Runner else None
+
 async def stream_plan_response(request: schemas.TravelRequest, user_email: str) -> AsyncGenerator[str, None]:
     if not Runner:
-        yield "ERRO: Bibliotecas de IA não instaladas no servidor."
+        yield ErrorChunk("ERRO: Bibliotecas de IA não instaladas no servidor.")
         return
 
-    APP_NAME = "travel_planner"
     USER_ID = user_email
-    SESSION_ID = f"session_{datetime.now().timestamp()}" 
+
+    # Ajuste de um plano anterior: continua a conversa da sessão recente, se ainda existir
+    SESSION_ID = None
+    if request.refinement and hasattr(session_service, "recent_session_id"):
+        SESSION_ID = session_service.recent_session_id(APP_NAME, USER_ID)
+    new_session = SESSION_ID is None
+    if new_session:
+        SESSION_ID = f"session_{uuid.uuid4().hex}"
 
     print(f"\n--- NOVA REQUISIÇÃO DE {user_email} ---")
 
-    await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    # Links profundos das ferramentas: o modelo vê só marcadores, trocados aqui na saída.
+    # Num ajuste, o modelo pode repetir marcadores dos turnos anteriores: os links vêm da sessão
+    links = LinkResolver()
+    if not new_session:
+        session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+        if session is not None:
+            links = LinkResolver.from_snapshot(session.state.get(LINKS_STATE_KEY))
+    current_links.set(links)
+    # Pesos do ranking de hotéis deste pedido (vistos pela ferramenta e pelo prefetch)
+    current_weights.set(RankingWeights.from_dict(request.hotelWeights))
+
+    # Dispara as ferramentas antes mesmo de o agente pedir por elas
+    prefetch = should_prefetch(request)
+    if prefetch:
+        start_prefetch(request)
+
+    if new_session:
+        await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    else:
+        print(f"💬 [LOG] Ajuste do plano na sessão {SESSION_ID}")
     
-    # Inicializa o Runner com o agente importado
-    runner = Runner(agent=booking_integrator, app_name=APP_NAME, session_service=session_service)
+    # Pega um Runner já inicializado do pool
+    runner = runner_pool.checkout()
 
     final_return_date = request.returnDate if request.returnDate else request.departureDate
 
@@ -46,6 +99,19 @@ async def stream_plan_response(request: schemas.TravelRequest, user_email: str)
     - Orçamento Total: R$ {request.totalBudget} 
     - Orçamento Hotel (por noite): R$ {request.nightlyBudget}
     - Preferências: {request.preferences}
+
+    Os links das ferramentas vêm como marcadores [[link:...]]: copie-os exatamente onde o link deve aparecer.
+    """
+
+    if request.refinement:
+        user_prompt += f"""
+    Ajuste o plano conforme este pedido: {request.refinement}
+    """
+
+    if prefetch:
+        # Com os mesmos argumentos do pré-carregamento, as ferramentas respondem na hora
+        user_prompt += f"""
+    (Para recomendações gerais use a categoria "{DEFAULT_RECOMMENDATION_CATEGORY}".)
     """
 
     content = types.Content(role="user", parts=[types.Part(text=user_prompt)])
@@ -55,24 +121,146 @@ async def stream_plan_response(request: schemas.TravelRequest, user_email: str)
             if hasattr(event, "content") and event.content and event.content.parts:
                 for part in event.content.parts:
                     if hasattr(part, "text") and part.text:
-                        yield part.text
+                        text = links.feed(part.text)
+                        if text:
+                            yield text
+        tail = links.flush()
+        if tail:
+            yield tail
+        if hasattr(session_service, "update_state"):
+            session_service.update_state(APP_NAME, USER_ID, SESSION_ID, {LINKS_STATE_KEY: links.snapshot()})
+    except asyncio.CancelledError:
+        # Cliente desistiu: interrompe o agente (e as ferramentas do turno atual) e libera
+        # a sessão. O pré-carregamento continua: preenche o cache compartilhado e pode ser
+        # a busca que outros pedidos iguais estão esperando
+        print(f"🛑 [LOG] Geração cancelada para {user_email}")
+        if new_session:
+            await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+        raise
     except Exception as e:
-        yield f"\n\nERRO INTERNO DO SERVIDOR: {e}"
+        yield ErrorChunk(f"\n\nERRO INTERNO DO SERVIDOR: {e}")
     finally:
-        # Verifica se o método close existe antes de chamar (segurança)
-        if hasattr(runner, 'close'):
-            await runner.close()
+        await runner_pool.release(runner)
+
+def with_output_format(request: schemas.TravelRequest, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """O cache e o single-flight guardam Markdown; a conversão para HTML é por pedido."""
+    return render_html_stream(stream) if request.outputFormat == "html" else stream
+
+async def with_fast_fallback(request: schemas.TravelRequest, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """Se o agente falha antes de escrever qualquer coisa, entrega o plano rápido no lugar do erro."""
+    first = True
+    async for chunk in stream:
+        if first and isinstance(chunk, ErrorChunk):
+            print(f"⚡ [LOG] Agente indisponível ({' '.join(chunk.split())[:80]}); usando o plano rápido")
+            await stream.aclose()
+            async for fast_chunk in stream_fast_plan(request):
+                yield fast_chunk
+            return
+        first = False
+        yield chunk
+
+def forget_refinement_target(user_email: str):
+    """
+    Plano servido sem o agente (cache ou modo rápido): nenhuma sessão corresponde a ele,
+    então um ajuste seguinte não pode continuar a sessão de outra viagem.
+    """
+    if hasattr(session_service, "forget_recent"):
+        session_service.forget_recent(APP_NAME, user_email)
+
+def use_fast_plan(request: schemas.TravelRequest) -> bool:
+    if request.planMode != "auto":
+        return request.planMode == "fast"
+    return not Runner or (PLAN_FAST_ON_OVERLOAD and plan_admission.overloaded())
 
 @router.post("/generate-plan")
 async def generate_plan(
     request: schemas.TravelRequest, 
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: models.User = Depends(auth.get_current_user),
+    last_event_id: Optional[str] = Header(default=None),
 ):
-    return StreamingResponse(
-        stream_plan_response(request, current_user.email), 
-        media_type="text/event-stream"
-    )
+    # Reconexão: continua o stream anterior a partir do último evento recebido
+    if last_event_id:
+        resumed = sse_streams.resume(last_event_id, current_user.email)
+        if resumed:
+            return sse_response(resumed)
+
+    # Popularidade do destino (para o aquecimento do cache fora de pico)
+    cache_warmer.record(request)
+
+    # Pedido idêntico recente: repete o plano gravado sem rodar o agente.
+    # Ajustes nunca passam pelo cache: dependem da sessão que continuam, que não está na chave
+    cache_key = plan_cache_key(request, current_user.email)
+    use_cache = not request.refinement
+    cached_chunks = get_cached_plan(cache_key) if use_cache and not request.bypassCache else None
+    if cached_chunks:
+        forget_refinement_target(current_user.email)
+        stream = sse_streams.start(with_output_format(request, replay_plan(cached_chunks)), current_user.email)
+        return sse_response(stream.follow())
+
+    # Plano rápido: só as ferramentas, sem vaga de geração e fora do cache de planos
+    if use_fast_plan(request):
+        forget_refinement_target(current_user.email)
+        plan_admission.check_rate(current_user.email)
+        plan_admission.fast_plans += 1
+        stream = sse_streams.start(with_output_format(request, stream_fast_plan(request)), current_user.email)
+        return sse_response(stream.follow())
+
+    # Vaga de geração (pode esperar na fila ou ser recusada com 429/503)
+    admitted_at = await plan_admission.admit(current_user.email)
+
+    def generate():
+        stream = stream_plan_response(request, current_user.email)
+        return record_plan(cache_key, stream) if use_cache else stream
+
+    if PLAN_SINGLEFLIGHT:
+        stream = plan_flight.subscribe((current_user.email, request.canonical_key()), generate)
+    else:
+        stream = generate()
+    # Fora do cache e do single-flight: o plano rápido de reserva nunca é gravado como plano do agente
+    if request.planMode == "auto":
+        stream = with_fast_fallback(request, stream)
+
+    # A geração roda numa task própria: se a conexão cair, o cliente pode retomar
+    sse_stream = sse_streams.start(with_output_format(request, stream), current_user.email)
+    # A vaga só é liberada quando a geração termina (ou é cancelada), não quando o handler retorna
+    sse_stream.task.add_done_callback(lambda _: plan_admission.release(admitted_at))
+    return sse_response(sse_stream.follow())
+
+@router.post("/preview-plan")
+async def preview_plan(request: schemas.TravelRequest, http_request: Request):
+    """Prévia sem login: sempre o plano rápido (sem LLM), com limite por IP e orçamento diário global."""
+    client = f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+    plan_admission.check_rate(client)
+    plan_admission.fast_plans += 1
+    stream = sse_streams.start(with_output_format(request, stream_preview_plan(request)), client)
+    return sse_response(stream.follow())
 
 @router.post("/download-plan")
-async def download_plan(request: schemas.PlanDownloadRequest):
-    return Response(content="PDF indisponível (Falta biblioteca GTK no servidor)", media_type="text/plain")
\ No newline at end of file
+async def download_plan(
+    request: schemas.PlanDownloadRequest,
+    current_user: models.User = Depends(auth.get_current_user),
+    format: str = Query(default="pdf", pattern="^(pdf|html)$"),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    if len(request.plan) > EXPORT_MAX_PLAN_CHARS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Plano grande demais para exportar")
+
+    try:
+        # Renderização num pool de processos, com cache pelo hash do conteúdo
+        content, digest = await export_plan(request.plan, format)
+    except ExportUnavailable as e:
+        print(f"❌ [LOG] Exportação {format.upper()} indisponível: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{format.upper()} indisponível neste servidor. Use ?format=html.",
+        )
+
+    etag = f'"{format}-{digest[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600",
+        "Content-Disposition": f'attachment; filename="plano-de-viagem.{format}"',
+    }
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type=MEDIA_TYPES[format], headers=headers)
\ No newline at end of file
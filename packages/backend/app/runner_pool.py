@@ -0,0 +1,63 @@
+# Pool de Runners do ADK já inicializados.
+# O Runner não guarda estado da execução (tudo fica na sessão), então o mesmo objeto
+# pode atender vários pedidos. Em vez de construir um por requisição, mantemos até
+# RUNNER_POOL_SIZE prontos; sob pico, Runners extras são criados e descartados no fim.
+import os
+from collections import deque
+from typing import Any, Callable, Deque
+
+RUNNER_POOL_SIZE = int(os.getenv("RUNNER_POOL_SIZE", "8"))
+
+
+class RunnerPool:
+    def __init__(self, factory: Callable[[], Any], size: int = RUNNER_POOL_SIZE):
+        self._factory = factory
+        self.size = size
+        self._idle: Deque[Any] = deque()
+        self.in_use = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _create(self):
+        self.created += 1
+        return self._factory()
+
+    def warm(self):
+        """Pré-cria os Runners (chamado no startup, fora do caminho do primeiro pedido)."""
+        while len(self._idle) < self.size:
+            self._idle.append(self._create())
+
+    def checkout(self):
+        if self._idle:
+            runner = self._idle.pop()
+            self.reused += 1
+        else:
+            runner = self._create()
+        self.in_use += 1
+        return runner
+
+    async def release(self, runner):
+        self.in_use -= 1
+        if len(self._idle) < self.size:
+            self._idle.append(runner)
+            return
+        self.discarded += 1
+        if hasattr(runner, "close"):
+            await runner.close()
+
+    async def close(self):
+        while self._idle:
+            runner = self._idle.pop()
+            if hasattr(runner, "close"):
+                await runner.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+        }
@@ -1,5 +1,9 @@
+import json
+import hashlib
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import Dict, Literal, Optional
+from app.tools.cache import normalize_arg
+from app.tools.destinations import place_key
 
 # --- Schemas de Autenticação ---
 class UserCreate(BaseModel):
@@ -33,6 +37,19 @@ class TravelRequest(BaseModel):
     totalBudget: float
     nightlyBudget: float
     preferences: str
+    # Pré-carrega as ferramentas em paralelo (None = usa a configuração do servidor)
+    prefetch: Optional[bool] = None
+    # Ignora o cache de planos e força uma nova geração
+    bypassCache: bool = False
+    # Pedido de ajuste do plano anterior (continua a sessão recente do usuário, se houver)
+    refinement: Optional[str] = None
+    # Pesos do ranking de hotéis (price, rating, reviews, distance); None = padrões do servidor
+    hotelWeights: Optional[Dict[str, float]] = None
+    # "html": o stream traz deltas de HTML (blocos já fechados) em vez de Markdown
+    outputFormat: Literal["markdown", "html"] = "markdown"
+    # "fast": plano montado só com as ferramentas, sem LLM; "auto": agente, com o modo
+    # rápido sob sobrecarga ou se o agente falhar
+    planMode: Literal["auto", "agent", "fast"] = "auto"
 
     @field_validator('totalBudget', 'nightlyBudget')
     def budgets_must_be_positive(cls, v):
@@ -40,5 +57,20 @@ class TravelRequest(BaseModel):
             raise ValueError('O orçamento não pode ser negativo')
         return v
 
+    def canonical_key(self) -> str:
+        """Hash estável da viagem pedida (destinos pelo id canônico; ignora caixa, espaços e flags de execução como 'prefetch', 'bypassCache', 'outputFormat' e 'planMode')."""
+        fields = {
+            "origin": place_key(self.origin),
+            "destination": place_key(self.destination),
+            "departureDate": self.departureDate,
+            "returnDate": self.returnDate or self.departureDate,
+            "totalBudget": round(self.totalBudget, 2),
+            "nightlyBudget": round(self.nightlyBudget, 2),
+            "preferences": normalize_arg(self.preferences),
+            "refinement": normalize_arg(self.refinement) if self.refinement else None,
+            "hotelWeights": dict(sorted(self.hotelWeights.items())) if self.hotelWeights else None,
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
 class PlanDownloadRequest(BaseModel):
     plan: str
\ No newline at end of file
@@ -0,0 +1,206 @@
+# Serviço de sessões em memória, com limite.
+# O InMemorySessionService do ADK guarda todas as sessões para sempre; com uma sessão
+# por /generate-plan, a memória do worker só cresce. Aqui cada sessão expira após
+# SESSION_TTL segundos sem uso, o total é limitado a SESSION_MAX_ENTRIES (LRU), e os
+# eventos da conversa ficam guardados como JSON comprimido (zlib), não como objetos.
+# A sessão mais recente de cada usuário pode ser retomada num pedido de ajuste.
+import os
+import json
+import time
+import zlib
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(30 * 60)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_COMPRESSION_LEVEL = 6
+
+SessionKey = Tuple[str, str, str]
+
+
+class _StoredSession:
+    """Forma compacta de uma sessão: estado + eventos serializados e comprimidos."""
+
+    __slots__ = ("state", "events", "last_update_time", "expires_at", "nbytes")
+
+    def __init__(self, state: Dict[str, Any], last_update_time: float):
+        self.state = state
+        # (timestamp, JSON comprimido do evento)
+        self.events: List[Tuple[float, bytes]] = []
+        self.last_update_time = last_update_time
+        self.expires_at = 0.0
+        self.nbytes = 0
+
+
+def _pack(event: Event) -> bytes:
+    return zlib.compress(event.model_dump_json(exclude_none=True).encode(), SESSION_COMPRESSION_LEVEL)
+
+
+def _unpack(blob: bytes) -> Event:
+    return Event.model_validate_json(zlib.decompress(blob))
+
+
+class BoundedSessionService(BaseSessionService):
+    def __init__(self, ttl: int = SESSION_TTL, maxsize: int = SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._sessions: "OrderedDict[SessionKey, _StoredSession]" = OrderedDict()
+        # Sessão mais recente de cada (app, usuário), para pedidos de ajuste
+        self._latest: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self.reused = 0
+
+    # --- Armazenamento ---
+
+    def _state_size(self, stored: _StoredSession) -> int:
+        return len(json.dumps(stored.state, default=str))
+
+    def _touch(self, key: SessionKey, stored: _StoredSession):
+        stored.expires_at = time.monotonic() + self.ttl
+        self._sessions.move_to_end(key)
+
+    def _lookup(self, key: SessionKey) -> Optional[_StoredSession]:
+        stored = self._sessions.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expired += 1
+            return None
+        self._touch(key, stored)
+        return stored
+
+    def _remove(self, key: SessionKey):
+        self._sessions.pop(key, None)
+        app_name, user_id, session_id = key
+        if self._latest.get((app_name, user_id)) == session_id:
+            del self._latest[(app_name, user_id)]
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, s in self._sessions.items() if s.expires_at <= now]:
+            self._remove(key)
+            self.expired += 1
+        while len(self._sessions) > self.maxsize:
+            key = next(iter(self._sessions))
+            self._remove(key)
+            self.evicted += 1
+
+    def _to_session(self, key: SessionKey, stored: _StoredSession, config: Optional[GetSessionConfig] = None) -> Session:
+        blobs = stored.events
+        if config and config.after_timestamp:
+            blobs = [e for e in blobs if e[0] >= config.after_timestamp]
+        if config and config.num_recent_events:
+            blobs = blobs[-config.num_recent_events:]
+        app_name, user_id, session_id = key
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(stored.state),
+            events=[_unpack(blob) for _, blob in blobs],
+            last_update_time=stored.last_update_time,
+        )
+
+    # --- Interface do ADK ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id or uuid.uuid4().hex
+        key = (app_name, user_id, session_id)
+        stored = _StoredSession(dict(state or {}), time.time())
+        stored.nbytes = self._state_size(stored)
+        with self._lock:
+            self._sessions[key] = stored
+            self._touch(key, stored)
+            self._latest[(app_name, user_id)] = session_id
+            self._evict()
+        return self._to_session(key, stored)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            stored = self._lookup(key)
+            if stored is None:
+                return None
+            return self._to_session(key, stored, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        with self._lock:
+            keys = [k for k in self._sessions if k[0] == app_name and k[1] == user_id]
+            sessions = [
+                Session(id=k[2], app_name=app_name, user_id=user_id, last_update_time=self._sessions[k].last_update_time)
+                for k in keys
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._remove((app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        # Atualiza o objeto em uso pelo Runner e grava a versão compacta
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        blob = _pack(event)
+        with self._lock:
+            stored = self._lookup(key)
+            if stored is None:
+                return event
+            state_size = self._state_size(stored)
+            stored.state = dict(session.state)
+            stored.events.append((event.timestamp, blob))
+            stored.last_update_time = event.timestamp
+            stored.nbytes += len(blob) + self._state_size(stored) - state_size
+        return event
+
+    # --- Extras ---
+
+    def recent_session_id(self, app_name: str, user_id: str) -> Optional[str]:
+        """Id da última sessão do usuário, se ainda não expirou."""
+        with self._lock:
+            session_id = self._latest.get((app_name, user_id))
+            if session_id is None or self._lookup((app_name, user_id, session_id)) is None:
+                return None
+            self.reused += 1
+            return session_id
+
+    def forget_recent(self, app_name: str, user_id: str):
+        """O próximo ajuste do usuário não continua nenhuma sessão (o último plano não veio do agente)."""
+        with self._lock:
+            self._latest.pop((app_name, user_id), None)
+
+    def update_state(self, app_name: str, user_id: str, session_id: str, delta: Dict[str, Any]):
+        """Grava chaves no estado da sessão fora de um evento do Runner (ex.: links do plano)."""
+        with self._lock:
+            stored = self._lookup((app_name, user_id, session_id))
+            if stored is None:
+                return
+            state_size = self._state_size(stored)
+            stored.state.update(delta)
+            stored.nbytes += self._state_size(stored) - state_size
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict()
+            return {
+                "live": len(self._sessions),
+                "maxsize": self.maxsize,
+                "bytes": sum(s.nbytes for s in self._sessions.values()),
+                "events": sum(len(s.events) for s in self._sessions.values()),
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "reused": self.reused,
+            }
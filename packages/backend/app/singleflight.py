@@ -0,0 +1,162 @@
+# Coalescência de chamadas idênticas em andamento ("single-flight").
+# Quando várias requisições iguais chegam ao mesmo tempo, só a primeira chama o
+# serviço externo; as demais aguardam e recebem o mesmo resultado. O cache sozinho
+# não resolve esse caso, porque a primeira chamada ainda não terminou de preenchê-lo.
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _Flight:
+    __slots__ = ("future", "task", "waiters")
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        # Marca como "em execução": quem desiste de esperar não consegue cancelá-la
+        self.future.set_running_or_notify_cancel()
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Garante no máximo uma execução em andamento por chave.
+    Usa concurrent.futures.Future para que chamadas de event loops diferentes
+    (ex.: loop do uvicorn e loop de fundo dos wrappers síncronos) compartilhem o resultado.
+    A execução roda numa task própria, e não na coroutine de quem chegou primeiro:
+    se esse chamador for cancelado, os outros continuam esperando o mesmo resultado.
+    A task só é cancelada quando ninguém mais está esperando.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, key: Hashable, field: str):
+        # Chaves em tupla são agrupadas pelo primeiro elemento (nome da ferramenta)
+        group = str(key[0]) if isinstance(key, tuple) else "default"
+        stats = self._stats.setdefault(group, {"leaders": 0, "joins": 0})
+        stats[field] += 1
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            flight = self._pending.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._pending[key] = _Flight()
+            flight.waiters += 1
+            self._count(key, "leaders" if leader else "joins")
+
+        if leader:
+            flight.task = asyncio.get_running_loop().create_task(func())
+            flight.task.add_done_callback(lambda task: self._settle(key, flight, task))
+
+        try:
+            return await asyncio.wrap_future(flight.future)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.future.done()
+                # Ninguém mais esperando: a próxima chamada começa uma execução nova
+                if abandoned and self._pending.get(key) is flight:
+                    del self._pending[key]
+            if abandoned and flight.task is not None:
+                flight.task.get_loop().call_soon_threadsafe(flight.task.cancel)
+            raise
+
+    def _settle(self, key: Hashable, flight: _Flight, task: asyncio.Task):
+        with self._lock:
+            if self._pending.get(key) is flight:
+                del self._pending[key]
+        if task.cancelled():
+            flight.future.set_exception(RuntimeError("Execução cancelada"))
+        elif task.exception() is not None:
+            flight.future.set_exception(task.exception())
+        else:
+            flight.future.set_result(task.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._pending), "groups": {k: dict(v) for k, v in self._stats.items()}}
+
+
+class _Broadcast:
+    """Um stream em andamento: guarda os pedaços já emitidos e acorda quem está ouvindo."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.changed = asyncio.Condition()
+        self.listeners = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def pump(self, source: AsyncGenerator[str, None]):
+        try:
+            async for chunk in source:
+                async with self.changed:
+                    self.chunks.append(chunk)
+                    self.changed.notify_all()
+        finally:
+            async with self.changed:
+                self.done = True
+                self.changed.notify_all()
+
+    async def listen(self) -> AsyncGenerator[str, None]:
+        # Quem chega depois recebe desde o início o que já foi gerado
+        position = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.chunks) > position or self.done)
+                new_chunks = self.chunks[position:]
+                finished = self.done
+            position += len(new_chunks)
+            for chunk in new_chunks:
+                yield chunk
+            if finished and position >= len(self.chunks):
+                return
+
+
+class StreamFlight:
+    """Single-flight para streams: requisições iguais e simultâneas compartilham uma única geração."""
+
+    def __init__(self):
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._tasks = set()
+        self.leaders = 0
+        self.joins = 0
+
+    async def subscribe(self, key: Hashable, factory: Callable[[], AsyncGenerator[str, None]]) -> AsyncGenerator[str, None]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.leaders += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            task = asyncio.create_task(broadcast.pump(factory()))
+            broadcast.task = task
+            self._tasks.add(task)
+            task.add_done_callback(lambda t: self._finish(key, broadcast, t))
+        else:
+            self.joins += 1
+            print("🔁 [LOG] Requisição idêntica em andamento: reaproveitando a geração")
+
+        broadcast.listeners += 1
+        try:
+            async for chunk in broadcast.listen():
+                yield chunk
+        finally:
+            broadcast.listeners -= 1
+            # Ninguém mais ouvindo: não vale a pena continuar a geração
+            if broadcast.listeners == 0 and not broadcast.done:
+                broadcast.task.cancel()
+
+    def _finish(self, key: Hashable, broadcast: _Broadcast, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+        if not task.cancelled() and task.exception():
+            print(f"❌ Erro na geração compartilhada: {task.exception()}")
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._streams), "leaders": self.leaders, "joins": self.joins}
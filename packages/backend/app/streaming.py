@@ -0,0 +1,274 @@
+# Estágio de streaming entre o gerador do plano e o StreamingResponse.
+# - Enquadramento SSE de verdade (id:/event:/data:), em vez de texto cru.
+# - Junta pedaços pequenos (por tamanho ou janela de tempo): menos writes/flushes.
+# - Heartbeats enquanto o modelo "pensa", para proxies e celulares não derrubarem a conexão.
+# - Buffer circular por stream: o cliente que reconecta com Last-Event-ID continua de onde
+#   parou, em vez de gerar o plano inteiro de novo. Por isso a geração roda numa task
+#   própria, e cada conexão HTTP é só uma "leitora" do buffer.
+# - Se todas as leitoras se desconectam e ninguém retoma dentro de SSE_DISCONNECT_GRACE
+#   segundos, a geração é cancelada (agente, ferramentas e sessão) e contada como abandonada.
+import os
+import uuid
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, Deque, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.plan_cache import ErrorChunk
+
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "512"))
+SSE_COALESCE_WINDOW = float(os.getenv("SSE_COALESCE_WINDOW", "0.05"))
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_RESUME_BUFFER_EVENTS = int(os.getenv("SSE_RESUME_BUFFER_EVENTS", "512"))
+SSE_RESUME_TTL = float(os.getenv("SSE_RESUME_TTL", "300"))
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "1000"))
+SSE_DISCONNECT_GRACE = float(os.getenv("SSE_DISCONNECT_GRACE", "10"))
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+GAP_MESSAGE = "ERRO: parte do plano se perdeu durante a transmissão. Gere o plano novamente."
+
+_END = object()
+
+
+def format_event(data: str, event_id: Optional[str] = None, event: Optional[str] = None) -> str:
+    """Monta um evento SSE; cada linha do texto vira uma linha 'data:'."""
+    frame = ""
+    if event_id:
+        frame += f"id: {event_id}\n"
+    if event:
+        frame += f"event: {event}\n"
+    for line in data.split("\n"):
+        frame += f"data: {line}\n"
+    return frame + "\n"
+
+
+HEARTBEAT = ": ping\n\n"
+
+
+async def coalesce(source: AsyncGenerator[str, None], max_bytes: int = SSE_COALESCE_BYTES,
+                   window: float = SSE_COALESCE_WINDOW) -> AsyncGenerator[str, None]:
+    """
+    Agrupa pedaços consecutivos até max_bytes ou até a janela de tempo fechar.
+    Um ErrorChunk nunca é misturado com texto comum (vira um evento próprio).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+        finally:
+            await queue.put(_END)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    try:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, ErrorChunk):
+                yield item
+                continue
+
+            buffer, size = [item], len(item)
+            deadline = loop.time() + window
+            while size < max_bytes:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, ErrorChunk):
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+                    yield item
+                    break
+                buffer.append(item)
+                size += len(item)
+
+            if buffer:
+                yield "".join(buffer)
+        # Propaga exceções do gerador de origem
+        await pump_task
+    finally:
+        pump_task.cancel()
+
+
+class SSEStream:
+    """Uma geração em andamento (ou recém-terminada), com os últimos eventos num buffer circular."""
+
+    def __init__(self, owner: str, registry: "StreamRegistry"):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.registry = registry
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=SSE_RESUME_BUFFER_EVENTS)
+        self.last_seq = 0
+        self.done = False
+        self.cancelled = False
+        self.finished_at: Optional[float] = None
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+        self.followers = 0
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+
+    async def _publish(self, frame_for_seq):
+        async with self.changed:
+            self.last_seq += 1
+            self.events.append((self.last_seq, frame_for_seq(f"{self.id}:{self.last_seq}")))
+            self.changed.notify_all()
+
+    async def run(self, source: AsyncGenerator[str, None]):
+        try:
+            async for text in coalesce(source):
+                event = "error" if isinstance(text, ErrorChunk) else None
+                await self._publish(lambda event_id: format_event(text, event_id, event))
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        except Exception as e:
+            await self._publish(lambda event_id: format_event(f"ERRO INTERNO DO SERVIDOR: {e}", event_id, "error"))
+        finally:
+            if not self.cancelled:
+                await self._publish(lambda event_id: format_event("", event_id, "done"))
+            async with self.changed:
+                self.done = True
+                self.finished_at = time.monotonic()
+                self.changed.notify_all()
+
+    async def follow(self, after_seq: int = 0) -> AsyncGenerator[str, None]:
+        """Entrega os eventos com seq > after_seq e acompanha os novos; manda heartbeat quando ocioso."""
+        self._attach()
+        try:
+            async for frame in self._follow(after_seq):
+                yield frame
+        finally:
+            self._detach()
+
+    def oldest_seq(self) -> int:
+        """Seq do evento mais antigo ainda no buffer circular."""
+        return self.events[0][0] if self.events else self.last_seq + 1
+
+    async def _follow(self, after_seq: int) -> AsyncGenerator[str, None]:
+        position = after_seq
+        while True:
+            lost = False
+            async with self.changed:
+                try:
+                    await asyncio.wait_for(
+                        self.changed.wait_for(lambda: self.last_seq > position or self.done),
+                        SSE_HEARTBEAT_INTERVAL,
+                    )
+                except asyncio.TimeoutError:
+                    pending, finished = [], False
+                else:
+                    # Leitora lenta demais: o buffer circular já descartou eventos que ela não viu
+                    lost = position + 1 < self.oldest_seq()
+                    pending = [frame for seq, frame in self.events if seq > position]
+                    finished = self.done
+                    position = self.last_seq
+
+            if lost:
+                # Sem id e sem "done": o cliente não consegue retomar e recomeça do zero
+                print(f"⚠️ [LOG] Stream {self.id}: leitora ficou para trás do buffer, encerrando")
+                yield format_event(GAP_MESSAGE, event="error")
+                return
+            if not pending and not finished:
+                yield HEARTBEAT
+                continue
+            for frame in pending:
+                yield frame
+            if finished:
+                return
+
+    def _attach(self):
+        self.followers += 1
+        if self._abandon_timer:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+
+    def _detach(self):
+        self.followers -= 1
+        if self.followers == 0 and not self.done:
+            # Cliente sumiu no meio da geração: espera um pouco por uma reconexão
+            self.registry.disconnects += 1
+            loop = asyncio.get_running_loop()
+            self._abandon_timer = loop.call_later(SSE_DISCONNECT_GRACE, self._abandon)
+
+    def _abandon(self):
+        self._abandon_timer = None
+        if self.followers == 0 and not self.done and self.task:
+            print(f"🛑 [LOG] Stream {self.id} abandonado: cancelando a geração")
+            self.registry.abandoned += 1
+            self.task.cancel()
+
+
+class StreamRegistry:
+    """Streams recentes por id, para retomada via Last-Event-ID. Limitado em quantidade e tempo."""
+
+    def __init__(self):
+        self._streams: "OrderedDict[str, SSEStream]" = OrderedDict()
+        self.resumed = 0
+        self.disconnects = 0
+        self.abandoned = 0
+
+    def _purge(self):
+        now = time.monotonic()
+        for stream_id in list(self._streams):
+            stream = self._streams[stream_id]
+            expired = stream.done and now - stream.finished_at > SSE_RESUME_TTL
+            if expired or (len(self._streams) > SSE_MAX_STREAMS and stream.done):
+                del self._streams[stream_id]
+
+    def start(self, source: AsyncGenerator[str, None], owner: str) -> SSEStream:
+        self._purge()
+        stream = SSEStream(owner, self)
+        self._streams[stream.id] = stream
+        stream.task = asyncio.create_task(stream.run(source))
+        return stream
+
+    def resume(self, last_event_id: str, owner: str) -> Optional[AsyncGenerator[str, None]]:
+        """
+        Retoma um stream a partir do Last-Event-ID ('<stream>:<seq>'), se ainda der.
+        Se o stream existe mas os eventos que faltam já saíram do buffer, responde 409:
+        começar outra geração por baixo duplicaria o texto que o cliente já mostrou.
+        """
+        stream_id, _, seq = last_event_id.partition(":")
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.cancelled or stream.owner != owner or not seq.isdigit():
+            return None
+        after_seq = int(seq)
+        if after_seq + 1 < stream.oldest_seq():
+            # Os eventos que faltam já saíram do buffer circular
+            print(f"⚠️ [LOG] Stream {stream_id}: evento {after_seq} já saiu do buffer, retomada recusada")
+            raise HTTPException(status_code=409, detail=GAP_MESSAGE)
+        self.resumed += 1
+        print(f"🔌 [LOG] Stream {stream_id} retomado a partir do evento {after_seq}")
+        return stream.follow(after_seq)
+
+    def stats(self) -> dict:
+        live = sum(1 for s in self._streams.values() if not s.done)
+        return {
+            "streams": len(self._streams),
+            "live": live,
+            "resumed": self.resumed,
+            "disconnects": self.disconnects,
+            "abandoned": self.abandoned,
+        }
+
+
+sse_streams = StreamRegistry()
+
+
+def sse_response(stream: AsyncGenerator[str, None]) -> StreamingResponse:
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
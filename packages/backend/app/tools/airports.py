@@ -0,0 +1,130 @@
+# tools/airports.py
+# Índice local de aeroportos: cidade, apelido, nome do aeroporto ou código -> códigos IATA.
+# Com os códigos, a busca de voos usa o motor estruturado 'google_flights' da SerpAPI
+# (preço, duração e escalas de cada oferta) em vez de uma busca web genérica.
+# A base (app/data/airports.tsv) liga cada aeroporto aos lugares de places.tsv, então
+# os apelidos do índice de geocodificação ("SP", "Sampa", "BH") também valem aqui.
+# Cidades com vários aeroportos devolvem todos (ex.: São Paulo -> GRU,CGH).
+import bisect
+import difflib
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.tools.destinations import resolve_place, split_country
+from app.tools.geocoding import fold
+
+AIRPORTS_PATH = Path(__file__).resolve().parent.parent / "data" / "airports.tsv"
+
+# Semelhança mínima para aceitar um nome com erro de digitação ("Pariss", "Lisbooa")
+FUZZY_CUTOFF = 0.85
+
+
+class Airport(NamedTuple):
+    iata: str
+    name: str
+    city: str
+    country: str
+
+
+class AirportIndex:
+    """
+    Índice em memória: nome normalizado (cidade, aeroporto, apelido ou código) -> códigos IATA.
+    Os nomes ficam também numa lista ordenada para buscas por prefixo (bisect).
+    """
+
+    def __init__(self):
+        self.airports: Dict[str, Airport] = {}
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_place: Dict[str, List[str]] = {}
+        self._sorted_names: List[str] = []
+        self._lock = threading.Lock()
+
+    def _index(self, name: str, iata: str):
+        key = fold(name)
+        if not key:
+            return
+        codes = self._by_name.get(key)
+        if codes is None:
+            self._by_name[key] = codes = []
+            bisect.insort(self._sorted_names, key)
+        if iata not in codes:
+            codes.append(iata)
+
+    def load(self, path: Path):
+        """Carrega um arquivo TSV: iata, nome, cidade, país, ids de lugares (','), apelidos ('|')."""
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                airport = Airport(fields[0], fields[1], fields[2], fields[3])
+                places = fields[4].split(",") if len(fields) > 4 and fields[4] else []
+                aliases = fields[5].split("|") if len(fields) > 5 and fields[5] else []
+                with self._lock:
+                    self.airports[airport.iata] = airport
+                    for name in [airport.iata, airport.name, airport.city, *aliases]:
+                        self._index(name, airport.iata)
+                    for place_id in places:
+                        self._by_place.setdefault(place_id, []).append(airport.iata)
+
+    def lookup(self, name: str) -> Tuple[str, ...]:
+        """
+        Códigos IATA para um nome. Tenta, nesta ordem: nome exato (cidade, aeroporto,
+        apelido ou código), lugar do índice de geocodificação e nome parecido (erros de
+        digitação), com ou sem o sufixo de país. Com país no nome, só valem os aeroportos
+        desse país. Tupla vazia se nada servir.
+        """
+        key = fold(name)
+        if not key:
+            return ()
+        codes = self._by_name.get(key)
+        if codes:
+            return tuple(codes)
+
+        place = resolve_place(name)
+        if place and place.id in self._by_place:
+            return tuple(self._by_place[place.id])
+
+        # "Pariss, França" -> "pariss"
+        key, country = split_country(name)
+        codes = self._by_name.get(key)
+        if not codes:
+            close = difflib.get_close_matches(key, self._sorted_names, n=1, cutoff=FUZZY_CUTOFF)
+            codes = self._by_name[close[0]] if close else []
+        if country:
+            # "Porto, Brasil" não é o aeroporto do Porto (OPO)
+            codes = [iata for iata in codes if self.airports[iata].country == country]
+        return tuple(codes)
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> List[Airport]:
+        """Aeroportos cujo nome, cidade, apelido ou código começa com o prefixo (autocompletar)."""
+        key = fold(prefix)
+        results: List[Airport] = []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_names, key)
+            for name in self._sorted_names[start:]:
+                if not name.startswith(key) or len(results) >= limit:
+                    break
+                for iata in self._by_name[name]:
+                    airport = self.airports[iata]
+                    if airport not in results:
+                        results.append(airport)
+        return results[:limit]
+
+
+_airport_index: Optional[AirportIndex] = None
+_airport_index_lock = threading.Lock()
+
+
+def get_airport_index() -> AirportIndex:
+    """Índice carregado uma única vez por processo."""
+    global _airport_index
+    with _airport_index_lock:
+        if _airport_index is None:
+            index = AirportIndex()
+            index.load(AIRPORTS_PATH)
+            _airport_index = index
+        return _airport_index
@@ -0,0 +1,189 @@
+# tools/cache.py
+import os
+import time
+import inspect
+import threading
+import functools
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+from app.singleflight import SingleFlight
+from app.tools.destinations import place_key
+
+# TTL (em segundos) de cada ferramenta. Preços de hotel e voo envelhecem rápido,
+# listas de atrações e imagens quase não mudam.
+TOOL_TTLS: Dict[str, int] = {
+    "flights": int(os.getenv("CACHE_TTL_FLIGHTS", 30 * 60)),
+    "hotels": int(os.getenv("CACHE_TTL_HOTELS", 15 * 60)),
+    "recommendations": int(os.getenv("CACHE_TTL_RECOMMENDATIONS", 24 * 60 * 60)),
+    "images": int(os.getenv("CACHE_TTL_IMAGES", 7 * 24 * 60 * 60)),
+    "weather": int(os.getenv("CACHE_TTL_WEATHER", 7 * 24 * 60 * 60)),
+}
+
+DEFAULT_TTL = 10 * 60
+
+# Sentinela para diferenciar "não está no cache" de um valor armazenado
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU em memória com expiração por entrada, compartilhado por todas as ferramentas.
+    As chaves são tuplas cujo primeiro elemento é o nome da ferramenta (usado nas métricas).
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, field: str):
+        stats = self._stats.setdefault(tool, {"hits": 0, "misses": 0, "evictions": 0})
+        stats[field] += 1
+
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._count(key[0], "misses")
+                return MISSING
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                # Entrada vencida conta como miss e sai do cache
+                del self._data[key]
+                self._count(key[0], "misses")
+                return MISSING
+
+            self._data.move_to_end(key)
+            self._count(key[0], "hits")
+            return value
+
+    def set(self, key: tuple, value: Any, ttl: Optional[float] = None):
+        ttl = DEFAULT_TTL if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted_key, _ = self._data.popitem(last=False)
+                self._count(evicted_key[0], "evictions")
+
+    def remaining(self, key: tuple) -> Optional[float]:
+        """Segundos até a entrada vencer (None se não está no cache). Não conta nas métricas."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: tuple):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, tool: Optional[str] = None):
+        """Remove todas as entradas (ou apenas as de uma ferramenta)."""
+        with self._lock:
+            if tool is None:
+                self._data.clear()
+                return
+            for key in [k for k in self._data if k[0] == tool]:
+                del self._data[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes: Dict[str, int] = {}
+            for key in self._data:
+                sizes[key[0]] = sizes.get(key[0], 0) + 1
+            tools = {}
+            for tool, counters in self._stats.items():
+                total = counters["hits"] + counters["misses"]
+                tools[tool] = {
+                    **counters,
+                    "entries": sizes.get(tool, 0),
+                    "hit_rate": round(counters["hits"] / total, 3) if total else 0.0,
+                }
+            return {"size": len(self._data), "maxsize": self.maxsize, "tools": tools}
+
+
+tool_cache = TTLCache(maxsize=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "512")))
+
+# Buscas em andamento: chamadas simultâneas com a mesma chave compartilham uma única
+# requisição externa (inclusive entre o pré-carregamento e o agente)
+tool_flight = SingleFlight()
+
+
+def normalize_arg(value: Any) -> Hashable:
+    """Normaliza um argumento para compor a chave: 'Paris ', 'PARIS' e 'paris' viram a mesma coisa."""
+    if isinstance(value, str):
+        value = unicodedata.normalize("NFKC", value)
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_arg(v) for v in value)
+    return value
+
+
+def make_key(tool: str, func: Callable, args: tuple, kwargs: dict, places: Iterable[str] = ()) -> tuple:
+    """
+    Monta a chave do cache a partir dos argumentos já associados à assinatura da função.
+    Os argumentos listados em `places` são destinos: entram pelo id canônico do lugar.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (tool,) + tuple(
+        place_key(v) if name in places and isinstance(v, str) else normalize_arg(v)
+        for name, v in bound.arguments.items()
+    )
+
+
+def cached(tool: str, places: Iterable[str] = ()):
+    """
+    Decorador que guarda o resultado da função no cache compartilhado com o TTL da ferramenta.
+    `places` nomeia os argumentos que são destinos ("Paris, França" e "paris" dão a mesma chave).
+    A função decorada deve ser assíncrona e LANÇAR exceção em caso de falha: exceções
+    nunca são cacheadas, e o fallback (texto com apenas o link) fica a cargo de quem chama.
+
+    Chamadas simultâneas com a mesma chave passam pelo single-flight: só a primeira vai
+    à API, as outras aguardam o mesmo resultado.
+    """
+    def decorator(func: Callable) -> Callable:
+        ttl = TOOL_TTLS.get(tool, DEFAULT_TTL)
+
+        # As versões síncronas das ferramentas chamam as assíncronas (run_sync), que já passam pelo cache
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"@cached('{tool}') espera uma função assíncrona: {func.__qualname__}")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            key = make_key(tool, func, args, kwargs, places)
+            value = tool_cache.get(key)
+            if value is not MISSING:
+                return value
+
+            async def fetch():
+                value = await func(*args, **kwargs)
+                tool_cache.set(key, value, ttl)
+                return value
+
+            return await tool_flight.do(key, fetch)
+
+        async def refresh(*args, **kwargs):
+            """Busca de novo e substitui a entrada, mesmo que ainda esteja válida (aquecimento)."""
+            key = make_key(tool, func, args, kwargs, places)
+
+            async def fetch():
+                value = await func(*args, **kwargs)
+                tool_cache.set(key, value, ttl)
+                return value
+
+            return await tool_flight.do(key, fetch)
+
+        async_wrapper.refresh = refresh
+        async_wrapper.cache_key = lambda *args, **kwargs: make_key(tool, func, args, kwargs, places)
+        async_wrapper.ttl = ttl
+        return async_wrapper
+
+    return decorator
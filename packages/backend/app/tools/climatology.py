@@ -0,0 +1,131 @@
+# tools/climatology.py
+# Normais climatológicas locais. Em vez de baixar um ano de dados do ERA5 a cada
+# consulta, calculamos uma vez por célula da grade (0.25°, a resolução do ERA5) a
+# média diária de N anos de temperatura e chuva, e guardamos em um arquivo .npy
+# (366 dias x 2 variáveis, float32) lido via memory-map. A média de uma viagem é
+# então um slice vetorizado, inclusive para viagens que cruzam o Ano Novo.
+#
+# Para pré-calcular destinos: python -m app.tools.climatology Paris Lisboa "Nova York"
+import os
+import sys
+import asyncio
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.singleflight import SingleFlight
+from app.tools.http import get_json
+
+CLIMATE_STORE_PATH = Path(os.getenv("CLIMATE_STORE_PATH", "climate_normals"))
+CLIMATE_YEARS = int(os.getenv("CLIMATE_YEARS", "10"))
+ERA5_API_URL = "https://archive-api.open-meteo.com/v1/era5"
+
+GRID_STEP = 0.25
+DAYS = 366  # Calendário de ano bissexto: 29/02 tem seu próprio índice
+TEMPERATURE, PRECIPITATION = 0, 1
+
+_loaded: Dict[Tuple[float, float], np.ndarray] = {}
+_computing = SingleFlight()
+
+
+def grid_cell(lat: float, lon: float) -> Tuple[float, float]:
+    return round(lat / GRID_STEP) * GRID_STEP, round(lon / GRID_STEP) * GRID_STEP
+
+
+def _cell_path(cell: Tuple[float, float]) -> Path:
+    return CLIMATE_STORE_PATH / f"{cell[0]:+.2f}_{cell[1]:+.2f}.npy"
+
+
+def day_slot(day: date) -> int:
+    """Índice 0..365 do dia no calendário bissexto (o ano é ignorado)."""
+    return date(2024, day.month, day.day).timetuple().tm_yday - 1
+
+
+def compute_normals(times: list, temperature: list, precipitation: list) -> np.ndarray:
+    """Agrupa a série diária por dia do ano e tira a média de todos os anos (ignora faltantes)."""
+    dates = np.array(times, dtype="datetime64[D]")
+    year_start = dates.astype("datetime64[Y]")
+    day_of_year = (dates - year_start).astype(int)
+    years = year_start.astype(int) + 1970
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    # Em anos comuns, a partir de 01/03 pulamos o índice reservado ao 29/02
+    slots = day_of_year + ((~leap) & (day_of_year >= 59))
+
+    normals = np.full((2, DAYS), np.nan, dtype=np.float32)
+    for row, series in ((TEMPERATURE, temperature), (PRECIPITATION, precipitation)):
+        values = np.array(series, dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.bincount(slots[valid], weights=values[valid], minlength=DAYS)
+        counts = np.bincount(slots[valid], minlength=DAYS)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normals[row] = sums / counts
+    return normals
+
+
+def window_average(normals: np.ndarray, start: date, end: date) -> Tuple[float, float]:
+    """Média (temperatura, chuva) entre duas datas; se end vier antes de start no calendário, dá a volta no ano."""
+    first, last = day_slot(start), day_slot(end)
+    if first <= last:
+        window = normals[:, first:last + 1]
+    else:
+        window = np.concatenate([normals[:, first:], normals[:, :last + 1]], axis=1)
+    temperature, precipitation = np.nanmean(window, axis=1)
+    return float(temperature), float(precipitation)
+
+
+async def _download_normals(cell: Tuple[float, float]) -> np.ndarray:
+    last_year = datetime.now().year - 1
+    params = {
+        "latitude": cell[0],
+        "longitude": cell[1],
+        "start_date": f"{last_year - CLIMATE_YEARS + 1}-01-01",
+        "end_date": f"{last_year}-12-31",
+        "daily": "temperature_2m_mean,precipitation_sum",
+        "timezone": "auto",
+    }
+    print(f"🌡️ [LOG] Calculando normais de {CLIMATE_YEARS} anos para a célula {cell}...")
+    data = await get_json(ERA5_API_URL, params)
+    if "daily" not in data:
+        raise Exception(f"Sem dados do ERA5 para a célula {cell}.")
+
+    daily = data["daily"]
+    normals = compute_normals(daily["time"], daily["temperature_2m_mean"], daily["precipitation_sum"])
+
+    # Grava em arquivo temporário e renomeia, para nunca deixar um .npy pela metade
+    CLIMATE_STORE_PATH.mkdir(parents=True, exist_ok=True)
+    path = _cell_path(cell)
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, normals)
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+async def get_normals(lat: float, lon: float) -> np.ndarray:
+    """Normais da célula que contém (lat, lon): memória -> arquivo local -> ERA5."""
+    cell = grid_cell(lat, lon)
+    if cell in _loaded:
+        return _loaded[cell]
+
+    path = _cell_path(cell)
+    if path.exists():
+        normals = np.load(path, mmap_mode="r")
+    else:
+        normals = await _computing.do(cell, lambda: _download_normals(cell))
+
+    _loaded[cell] = normals
+    return normals
+
+
+async def precompute(cities: list):
+    from app.tools.geocoding import get_coordinates
+
+    for city in cities:
+        lat, lon = await get_coordinates(city)
+        await get_normals(lat, lon)
+        print(f"✅ {city}: normais em {_cell_path(grid_cell(lat, lon))}")
+
+
+if __name__ == "__main__":
+    asyncio.run(precompute(sys.argv[1:]))
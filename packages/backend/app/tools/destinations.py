@@ -0,0 +1,87 @@
+# tools/destinations.py
+# Normalização de destinos: texto livre -> id canônico do lugar (ex.: 'paris-fr').
+# O mesmo destino chega como "Paris", "paris ", "PARIS" ou "Paris, França"; sem isso
+# cada variação vira uma chave diferente no cache, no single-flight e no cache de
+# planos. Aqui o nome é dobrado (acentos, caixa, pontuação), o sufixo de país é
+# retirado e os apelidos são resolvidos pelo índice de geocodificação (hash em memória).
+# É a API comum das ferramentas (chaves do @cached, aeroportos, hotéis, clima) e do
+# router de planos (TravelRequest.canonical_key).
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.tools.geocoding import Place, fold, get_geo_index
+
+COUNTRIES_PATH = Path(__file__).resolve().parent.parent / "data" / "countries.tsv"
+
+# Nomes de país com até 4 palavras ("estados unidos da america")
+MAX_COUNTRY_WORDS = 4
+
+_countries: Optional[Dict[str, str]] = None
+_countries_lock = threading.Lock()
+
+
+def _country_names() -> Dict[str, str]:
+    """Nome de país dobrado -> código ISO (carregado uma única vez por processo)."""
+    global _countries
+    with _countries_lock:
+        if _countries is None:
+            names: Dict[str, str] = {}
+            if COUNTRIES_PATH.exists():
+                with open(COUNTRIES_PATH, encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip() or line.startswith("#"):
+                            continue
+                        code, aliases = line.rstrip("\n").split("\t")
+                        for name in [code, *aliases.split("|")]:
+                            names.setdefault(fold(name), code)
+            _countries = names
+        return _countries
+
+
+def split_country(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Separa o sufixo de país: 'Paris, França' -> ('paris', 'FR'), 'Lisboa Portugal' ->
+    ('lisboa', 'PT'). O nome volta dobrado; sem país reconhecido, o código é None.
+    """
+    countries = _country_names()
+    # "Cidade, País" / "Cidade - País" / "Cidade (País)"
+    for separator in (",", " - ", "("):
+        if separator in name:
+            head, tail = name.split(separator, 1)
+            code = countries.get(fold(tail))
+            if code and fold(head):
+                return fold(head), code
+    # "Cidade País"
+    words = fold(name).split()
+    for size in range(min(MAX_COUNTRY_WORDS, len(words) - 1), 0, -1):
+        code = countries.get(" ".join(words[-size:]))
+        if code:
+            return " ".join(words[:-size]), code
+    return fold(name), None
+
+
+def resolve_place(name: str) -> Optional[Place]:
+    """Lugar do índice local para um nome em texto livre (None se não for conhecido)."""
+    index = get_geo_index()
+    place = index.lookup(name)
+    if place:
+        return place
+    head, country = split_country(name)
+    if country is None:
+        return None
+    place = index.lookup(head)
+    # "Porto, Brasil" não é a cidade do Porto
+    return place if place and place.country == country else None
+
+
+def place_key(name: str) -> str:
+    """
+    Chave canônica de um destino: o id do lugar quando conhecido; senão o nome dobrado,
+    com o país no mesmo formato dos ids ('Xyz, França' e 'XYZ França' -> 'xyz-fr').
+    """
+    place = resolve_place(name)
+    if place:
+        return place.id
+    head, country = split_country(name)
+    return f"{head.replace(' ', '-')}-{country.lower()}" if country else head
@@ -0,0 +1,75 @@
+# tools/dispatch.py
+# Execução concorrente das chamadas de ferramenta feitas pelo agente.
+# Quando o Gemini devolve várias function calls no mesmo turno, o ADK cria uma task
+# para cada uma e faz gather — mas, como as ferramentas eram síncronas, elas rodavam
+# uma depois da outra (e bloqueando o event loop). Aqui expomos versões assíncronas
+# com a mesma assinatura/docstring, limitadas por um semáforo global, com timeout e
+# isolamento de erros por chamada. São estas que o agent.yaml registra (dispatch.*).
+import os
+import asyncio
+import weakref
+import functools
+from typing import Awaitable, Callable
+
+from app.tools.flights import get_flight_options, get_flight_options_async
+from app.tools.hotels import get_hotel_options, get_hotel_options_async
+from app.tools.images import get_destination_images, get_destination_images_async
+from app.tools.recommendations import get_recommendations, get_recommendations_async
+from app.tools.weather import get_historical_average_weather, get_historical_average_weather_async
+
+MAX_CONCURRENT_TOOL_CALLS = int(os.getenv("MAX_CONCURRENT_TOOL_CALLS", "16"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+    return _semaphores[loop]
+
+
+async def call_tool(name: str, async_func: Callable[..., Awaitable[str]], **kwargs) -> str:
+    """
+    Executa uma ferramenta respeitando o limite global de concorrência e o timeout.
+    Falhas ficam isoladas nesta chamada: viram texto para o agente em vez de derrubar o turno.
+    """
+    async with _get_semaphore():
+        try:
+            return await asyncio.wait_for(async_func(**kwargs), timeout=TOOL_CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⏱️ [LOG] Ferramenta '{name}' excedeu {TOOL_CALL_TIMEOUT}s")
+            return f"A ferramenta {name} não respondeu a tempo. Continue o plano sem estes dados."
+        except Exception as e:
+            print(f"❌ Erro na ferramenta '{name}': {e}")
+            return f"Erro ao executar {name}: {e}"
+
+
+def concurrent_tool(sync_func: Callable[..., str], async_func: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]:
+    """
+    Cria a versão assíncrona de uma ferramenta para registrar no agente.
+    Mantém nome, docstring e assinatura da função síncrona (o ADK gera a declaração a partir deles).
+    """
+    @functools.wraps(sync_func)
+    async def tool(**kwargs) -> str:
+        return await call_tool(sync_func.__name__, async_func, **kwargs)
+
+    return tool
+
+
+# Ferramentas do agente, referenciadas no agent.yaml como dispatch.<nome>
+get_flight_options_tool = concurrent_tool(get_flight_options, get_flight_options_async)
+get_hotel_options_tool = concurrent_tool(get_hotel_options, get_hotel_options_async)
+get_recommendations_tool = concurrent_tool(get_recommendations, get_recommendations_async)
+get_historical_average_weather_tool = concurrent_tool(get_historical_average_weather, get_historical_average_weather_async)
+get_destination_images_tool = concurrent_tool(get_destination_images, get_destination_images_async)
+
+# Na mesma ordem do agent.yaml
+AGENT_TOOLS = [
+    get_flight_options_tool,
+    get_hotel_options_tool,
+    get_recommendations_tool,
+    get_historical_average_weather_tool,
+    get_destination_images_tool,
+]
@@ -1,72 +1,135 @@
 # tools/flights.py
 import os
-import serpapi
 import urllib.parse
-from typing import Optional
+from typing import Optional, Tuple, Union
+from app.tools.airports import get_airport_index
+from app.tools.cache import cached
+from app.tools.http import serpapi_search, run_sync
+from app.tools.resilience import with_deadline
+from app.tools.results import FlightOffer, FlightOffersResult, FlightOption, FlightResult, Link, shorten, render, render_unavailable
+
+# Ofertas do google_flights repassadas ao agente
+FLIGHT_OFFERS_MAX = int(os.getenv("FLIGHT_OFFERS_MAX", "5"))
+
+def _build_flights_url(origin: str, destination: str, date: str, return_date: Optional[str] = None) -> str:
+    """Monta o link do Google Flights com a pesquisa preenchida."""
+    # O Google Flights aceita consultas em linguagem natural via parâmetro 'q'
+    query_text = f"Flights from {origin} to {destination} on {date}"
+    if return_date:
+        query_text += f" returning {return_date}"
+
+    # Codifica a string para formato de URL
+    encoded_query = urllib.parse.quote(query_text)
+
+    # Monta a URL final forçando moeda (BRL) e idioma (pt-BR)
+    return f"https://www.google.com/travel/flights?q={encoded_query}&hl=pt-BR&curr=BRL"
 
 def get_flight_options(origin: str, destination: str, date: str, return_date: Optional[str] = None) -> str:
     """
     Busca voos e gera um link direto para o Google Flights com a pesquisa preenchida.
     """
-    
+    return run_sync(get_flight_options_async(origin, destination, date, return_date))
+
+async def get_flight_options_async(origin: str, destination: str, date: str, return_date: Optional[str] = None) -> str:
+    """Versão assíncrona de get_flight_options."""
+
     print(f"🛫 [LOG] Buscando voos de {origin} para {destination}...")
 
     api_key = os.getenv("SERPAPI_API_KEY")
     if not api_key:
         raise ValueError("SERPAPI_API_KEY não configurada no .env")
 
-    # 1. CONSTRUÇÃO DO LINK DIRETO (Resolve o problema do site genérico)
-    # O Google Flights aceita consultas em linguagem natural via parâmetro 'q'
-    query_text = f"Flights from {origin} to {destination} on {date}"
-    if return_date:
-        query_text += f" returning {return_date}"
-    
-    # Codifica a string para formato de URL
-    encoded_query = urllib.parse.quote(query_text)
-    
-    # Monta a URL final forçando moeda (BRL) e idioma (pt-BR)
-    google_flights_url = f"https://www.google.com/travel/flights?q={encoded_query}&hl=pt-BR&curr=BRL"
+    try:
+        return render(await with_deadline("flights", _search_flights(origin, destination, date, return_date)))
+
+    except Exception as e:
+        print(f"❌ Erro na API de voos: {e}")
+        # Mesmo se a API falhar, retornamos o link construído manualmente, pois ele não depende da API
+        return render_unavailable("voos", _flights_link(origin, destination, date, return_date))
+
+def _flights_link(origin: str, destination: str, date: str, return_date: Optional[str] = None) -> Link:
+    # CONSTRUÇÃO DO LINK DIRETO (Resolve o problema do site genérico)
+    url = _build_flights_url(origin, destination, date, return_date)
+    return Link.make("flights", "Ver Passagens e Preços no Google Voos", url)
+
+@cached("flights", places=("origin", "destination"))
+async def _search_flights(origin: str, destination: str, date: str, return_date: Optional[str] = None) -> Union[FlightOffersResult, FlightResult]:
+    """
+    Consulta a SerpAPI e monta o resultado para o Agente. Lança exceção em caso de falha
+    (o resultado só entra no cache quando a busca dá certo).
+    """
+    link = _flights_link(origin, destination, date, return_date)
+
+    # 2. BUSCA ESTRUTURADA: com os códigos IATA do índice local, uma única chamada ao
+    # motor 'google_flights' devolve ofertas com preço, duração e escalas
+    airports = get_airport_index()
+    departure_ids, arrival_ids = airports.lookup(origin), airports.lookup(destination)
+    if departure_ids and arrival_ids:
+        params = {
+            "api_key": os.getenv("SERPAPI_API_KEY"),
+            "engine": "google_flights",
+            "departure_id": ",".join(departure_ids),
+            "arrival_id": ",".join(arrival_ids),
+            "outbound_date": date,
+            "type": "1" if return_date else "2",  # 1 = ida e volta, 2 = só ida
+            "currency": "BRL",
+            "gl": "br",
+            "hl": "pt",
+        }
+        if return_date:
+            params["return_date"] = return_date
+
+        results = await serpapi_search(params)
+        offers = _parse_offers(results.get("best_flights", []), results.get("other_flights", []))
+        if offers:
+            return FlightOffersResult(origin, destination, date, return_date, departure_ids, arrival_ids, offers, link)
+        print(f"🛫 [LOG] Motor 'google_flights' sem ofertas para {departure_ids}>{arrival_ids}. Tentando busca genérica...")
+    else:
+        print(f"🛫 [LOG] Aeroporto não encontrado no índice local para '{origin}' ou '{destination}'. Usando busca genérica...")
 
-    # 2. BUSCA DE DADOS (Para o Agente ler)
-    # Usamos 'google_flights' engine se possível para dados estruturados, 
-    # mas a busca 'google' genérica é mais tolerante com nomes de cidades vs códigos IATA.
-    # Vamos manter a busca genérica para obter os snippets, mas anexar o link correto.
-    
+    # 3. FALLBACK: busca 'google' genérica, tolerante a qualquer nome de cidade
     params = {
-        "api_key": api_key,
+        "api_key": os.getenv("SERPAPI_API_KEY"),
         "engine": "google",
         "q": f"Google Flights voos {origin} para {destination}",
         "gl": "br",
         "hl": "pt"
     }
 
-    try:
-        client = serpapi.Client()
-        results = client.search(params)
-        organic_results = results.get("organic_results", [])
+    results = await serpapi_search(params)
+    organic_results = results.get("organic_results", [])
 
-        result_text = f"Opções de voos de {origin} para {destination} (Ida: {date}"
-        if return_date:
-            result_text += f", Volta: {return_date}"
-        result_text += "):\n"
-
-        # Adiciona algumas opções de texto para o Agente comentar
-        if organic_results:
-            for item in organic_results[:3]:
-                title = item.get("title", "")
-                snippet = item.get("snippet", "")
-                result_text += f"- {title}: {snippet}\n"
-        else:
-            result_text += "- Consulte o link abaixo para ver as opções em tempo real.\n"
-
-        # 3. ANEXAR O LINK DIRETO NO RETORNO
-        # Isso garante que o Agente inclua este link específico na resposta final markdown
-        result_text += f"\n🔗 **[Ver Passagens e Preços no Google Voos]({google_flights_url})**"
-        result_text += "\n(O link acima já abre com as datas e locais preenchidos)"
-            
-        return result_text
+    # Algumas opções de texto para o Agente comentar (o link leva às opções em tempo real)
+    options = tuple(
+        FlightOption(shorten(item.get("title", ""), 80), shorten(item.get("snippet", "")))
+        for item in organic_results[:3]
+    )
 
-    except Exception as e:
-        print(f"❌ Erro na API de voos: {e}")
-        # Mesmo se a API falhar, retornamos o link construído manualmente, pois ele não depende da API
-        return f"Não foi possível carregar os detalhes dos voos via API, mas você pode verificar diretamente no link:\n🔗 [Ver voos no Google Flights]({google_flights_url})" 
\ No newline at end of file
+    # Link direto separado do texto (com as datas e locais preenchidos)
+    return FlightResult(origin, destination, date, return_date, options, link)
+
+def _parse_offers(best: list, other: list) -> Tuple[FlightOffer, ...]:
+    """Converte os itinerários da SerpAPI em ofertas: as 'melhores' do Google primeiro, depois as mais baratas."""
+    def endpoint(segment: dict, key: str) -> str:
+        airport = segment.get(key, {})
+        # "2025-12-10 23:45" -> "GRU 23:45"
+        return f"{airport.get('id', '?')} {str(airport.get('time', '')).split(' ')[-1]}".strip()
+
+    def offer(item: dict) -> Optional[FlightOffer]:
+        segments = item.get("flights") or []
+        if not segments:
+            return None
+        airlines = dict.fromkeys(s.get("airline", "?") for s in segments)
+        price = item.get("price")
+        return FlightOffer(
+            shorten("+".join(airlines), 40),
+            int(price) if isinstance(price, (int, float)) else None,
+            item.get("total_duration"),
+            len(segments) - 1,
+            endpoint(segments[0], "departure_airport"),
+            endpoint(segments[-1], "arrival_airport"),
+        )
+
+    others = sorted(other, key=lambda item: item.get("price") if isinstance(item.get("price"), (int, float)) else float("inf"))
+    offers = [o for o in map(offer, [*best, *others]) if o is not None]
+    return tuple(offers[:FLIGHT_OFFERS_MAX])
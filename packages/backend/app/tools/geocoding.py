@@ -0,0 +1,149 @@
+# tools/geocoding.py
+# Índice local de cidades -> coordenadas, para não chamar a API de geocodificação
+# do Open-Meteo a cada consulta de clima. A base (app/data/places.tsv) cobre os
+# destinos mais procurados; o que faltar é buscado na API e gravado em um arquivo
+# local (write-back), que é carregado junto na próxima inicialização.
+import os
+import re
+import bisect
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.tools.http import get_json
+
+PLACES_PATH = Path(__file__).resolve().parent.parent / "data" / "places.tsv"
+GEOCODING_CACHE_PATH = Path(os.getenv("GEOCODING_CACHE_PATH", "geocoding_cache.tsv"))
+GEOCODING_API_URL = "https://geocoding-api.open-meteo.com/v1/search"
+
+
+class Place(NamedTuple):
+    id: str
+    name: str
+    country: str
+    lat: float
+    lon: float
+
+
+def fold(text: str) -> str:
+    """Remove acentos, caixa e pontuação: 'São Paulo ' e 'SAO-PAULO' viram 'sao paulo'."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w]+", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def _slug(name: str, country: str) -> str:
+    return f"{fold(name).replace(' ', '-')}-{country.lower()}"
+
+
+class GeoIndex:
+    """
+    Índice em memória: nome/apelido normalizado -> lugar.
+    Os nomes ficam também numa lista ordenada para buscas por prefixo (bisect).
+    """
+
+    def __init__(self):
+        self.places: Dict[str, Place] = {}
+        self._by_name: Dict[str, str] = {}
+        self._sorted_names: List[str] = []
+        self._lock = threading.Lock()
+
+    def _index(self, place: Place, aliases: List[str]):
+        self.places[place.id] = place
+        for name in [place.name, *aliases]:
+            key = fold(name)
+            if key and key not in self._by_name:
+                self._by_name[key] = place.id
+                bisect.insort(self._sorted_names, key)
+
+    def load(self, path: Path):
+        """Carrega um arquivo TSV: id, nome, país, lat, lon, apelidos separados por '|'."""
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                place = Place(fields[0], fields[1], fields[2], float(fields[3]), float(fields[4]))
+                aliases = fields[5].split("|") if len(fields) > 5 and fields[5] else []
+                with self._lock:
+                    self._index(place, aliases)
+
+    def add(self, place: Place, aliases: List[str], persist_to: Optional[Path] = None):
+        """Adiciona um lugar ao índice e, opcionalmente, grava no arquivo de write-back."""
+        with self._lock:
+            # Se a API devolveu um lugar que já conhecemos, só registramos o novo apelido
+            place = self.places.get(place.id, place)
+            self._index(place, aliases)
+            if persist_to is not None:
+                try:
+                    with open(persist_to, "a", encoding="utf-8") as f:
+                        f.write("\t".join([place.id, place.name, place.country, str(place.lat), str(place.lon), "|".join(aliases)]) + "\n")
+                except OSError as e:
+                    print(f"⚠️ Não foi possível gravar o cache de geocodificação: {e}")
+
+    def lookup(self, name: str) -> Optional[Place]:
+        place_id = self._by_name.get(fold(name))
+        return self.places.get(place_id) if place_id else None
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> List[Place]:
+        """Lugares cujo nome ou apelido começa com o prefixo (útil para autocompletar)."""
+        key = fold(prefix)
+        results: List[Place] = []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_names, key)
+            for name in self._sorted_names[start:]:
+                if not name.startswith(key) or len(results) >= limit:
+                    break
+                place = self.places[self._by_name[name]]
+                if place not in results:
+                    results.append(place)
+        return results
+
+
+_geo_index: Optional[GeoIndex] = None
+_geo_index_lock = threading.Lock()
+
+
+def get_geo_index() -> GeoIndex:
+    """Índice carregado uma única vez por processo (base + write-back)."""
+    global _geo_index
+    with _geo_index_lock:
+        if _geo_index is None:
+            index = GeoIndex()
+            index.load(PLACES_PATH)
+            index.load(GEOCODING_CACHE_PATH)
+            _geo_index = index
+        return _geo_index
+
+
+async def get_coordinates(city: str) -> Tuple[float, float]:
+    """Coordenadas da cidade: índice local primeiro, API do Open-Meteo como fallback."""
+    # Import tardio: destinations depende deste módulo
+    from app.tools.destinations import resolve_place, split_country
+
+    index = get_geo_index()
+    place = resolve_place(city)
+    if place:
+        return place.lat, place.lon
+
+    print(f"🌍 [LOG] '{city}' fora do índice local, consultando a API de geocodificação...")
+    # Sem o sufixo de país ("Gramado, Brasil" -> "gramado"): a API procura só pelo nome
+    name, wanted_country = split_country(city)
+    # get_json já verifica erros HTTP e codifica o nome da cidade na URL
+    geo_data = await get_json(GEOCODING_API_URL, {"name": name, "count": 1, "language": "pt", "format": "json"})
+    if "results" not in geo_data or not geo_data["results"]:
+        raise Exception(f"Não foi possível encontrar a cidade '{city}' no mapa.")
+
+    result = geo_data["results"][0]
+    country = result.get("country_code", "XX")
+    place = Place(_slug(result["name"], country), result["name"], country, result["latitude"], result["longitude"])
+    if wanted_country and wanted_country != country:
+        # A API achou um homônimo noutro país: não grava "Porto, Brasil" como apelido do Porto
+        print(f"⚠️ [LOG] '{city}' resolvido para '{result['name']}' ({country}), fora de {wanted_country}: sem gravar no índice")
+        return place.lat, place.lon
+    index.add(place, [city.strip()], persist_to=GEOCODING_CACHE_PATH)
+    return place.lat, place.lon
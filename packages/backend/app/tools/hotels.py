@@ -1,32 +1,71 @@
 # tools/hotels.py
 import os
-import serpapi
 import urllib.parse
 from typing import Optional
+from app.tools.cache import cached
+from app.tools.http import serpapi_search, run_sync
+from app.tools.resilience import with_deadline
+from app.tools.results import HotelSuggestionResult, Link, shorten, render, render_unavailable
+from app.tools.ranking import HotelPage, build_page, rank
+from app.tools.destinations import resolve_place
+
+# Páginas de propriedades buscadas para o ranking (cada página é uma busca na SerpAPI)
+HOTEL_SEARCH_PAGES = int(os.getenv("HOTEL_SEARCH_PAGES", "1"))
+
+def _build_hotels_url(city: str, check_in: str, check_out: str, budget: float) -> str:
+    """Monta o link do Google Travel (hotéis) com datas e filtro de preço."""
+    # Construímos uma query em linguagem natural que o Google entende
+    # Ex: "Hotels in Paris from 2023-10-10 to 2023-10-15 max price 500 BRL"
+    query_text = f"Hotels in {city} from {check_in} to {check_out}"
+    if budget > 0:
+        query_text += f" max price {int(budget)} BRL"
+
+    encoded_query = urllib.parse.quote(query_text)
+
+    # URL direta para a secção de hotéis
+    return f"https://www.google.com/travel/hotels?q={encoded_query}&hl=pt-BR&curr=BRL"
 
 def get_hotel_options(city: str, check_in: str, check_out: str, budget: float) -> str:
     """
     Busca hotéis e gera um link direto para o Google Travel com a pesquisa preenchida.
     """
+    return run_sync(get_hotel_options_async(city, check_in, check_out, budget))
+
+async def get_hotel_options_async(city: str, check_in: str, check_out: str, budget: float) -> str:
+    """Versão assíncrona de get_hotel_options."""
     api_key = os.getenv("SERPAPI_API_KEY")
     print(f"🏨 [LOG] Buscando hotéis em {city} ({check_in} a {check_out}) até R${budget}/noite...")
 
     if not api_key:
         raise ValueError("SERPAPI_API_KEY não configurada no .env")
 
-    # 1. CONSTRUÇÃO DO LINK DIRETO (A Melhoria)
-    # Construímos uma query em linguagem natural que o Google entende
-    # Ex: "Hotels in Paris from 2023-10-10 to 2023-10-15 max price 500 BRL"
-    query_text = f"Hotels in {city} from {check_in} to {check_out}"
-    if budget > 0:
-        query_text += f" max price {int(budget)} BRL"
-    
-    encoded_query = urllib.parse.quote(query_text)
-    
-    # URL direta para a secção de hotéis
-    google_hotels_url = f"https://www.google.com/travel/hotels?q={encoded_query}&hl=pt-BR&curr=BRL"
+    try:
+        result = await with_deadline("hotels", _search_hotels(city, check_in, check_out, budget))
+        # O cache guarda todos os candidatos; o ranking (com os pesos do pedido) é refeito aqui
+        return render(rank(result) if isinstance(result, HotelPage) else result)
+
+    except Exception as e:
+        print(f"❌ Erro inesperado ao buscar hotéis: {e}")
+        # Se a API falhar, o utilizador ainda recebe o link funcional
+        return render_unavailable("hoteis", _hotels_link(city, check_in, check_out, budget))
+
+
+def _hotels_link(city: str, check_in: str, check_out: str, budget: float) -> Link:
+    # CONSTRUÇÃO DO LINK DIRETO (com datas e filtros de preço já aplicados)
+    url = _build_hotels_url(city, check_in, check_out, budget)
+    return Link.make("hotels", "Ver Hotéis e Reservar no Google Travel", url)
+
 
-    # 2. BUSCA DE DADOS VIA API (Para o Agente ler e resumir)
+@cached("hotels", places=("city",))
+async def _search_hotels(city: str, check_in: str, check_out: str, budget: float):
+    """
+    Consulta o motor 'google_hotels' da SerpAPI. Lança exceção em caso de falha
+    para que apenas respostas válidas fiquem no cache.
+    """
+    api_key = os.getenv("SERPAPI_API_KEY")
+    link = _hotels_link(city, check_in, check_out, budget)
+
+    # 2. BUSCA DE DADOS VIA API (página completa, ranqueada localmente)
     params = {
         "api_key": api_key,
         "engine": "google_hotels",
@@ -37,49 +76,36 @@ def get_hotel_options(city: str, check_in: str, check_out: str, budget: float) -
         "currency": "BRL",
         "gl": "br",
         "hl": "pt",
-        "sort_by": "3" # 3 = 'Lowest price'
     }
 
-    try:
-        client = serpapi.Client()
-        results = client.search(params)
-        
-        properties = results.get("properties")
-
-        if not properties:
-            print("🏨 [LOG] Motor 'google_hotels' não retornou resultados. Tentando fallback genérico...")
-            return _search_hotels_fallback(city, budget, api_key, google_hotels_url)
-
-        result = f"Opções de hotéis em {city} (até R${budget}/noite, ordenados por preço):\n"
-        
-        for item in properties[:5]:
-            title = item.get("name", "")
-            rate = item.get("rate_per_night", {})
-            price = rate.get("lowest", item.get("price", "N/A"))
-            rating = item.get("overall_rating", "N/A")
-            gps = item.get("gps_coordinates", {})
-            
-            result += f"- {title}\n"
-            result += f"  Preço: {price} | Avaliação: {rating} ★\n"
-        
-        # 3. ANEXAR O LINK NO FINAL
-        result += f"\n🔗 **[Ver Hotéis e Reservar no Google Travel]({google_hotels_url})**"
-        result += "\n(Link com datas e filtros de preço já aplicados)"
-        
-        return result
-    
-    except Exception as e:
-        print(f"❌ Erro inesperado ao buscar hotéis: {e}")
-        # Se a API falhar, o utilizador ainda recebe o link funcional
-        return f"Não foi possível carregar a lista detalhada, mas você pode ver os hotéis disponíveis no link:\n🔗 [Ver Hotéis no Google]({google_hotels_url})"
+    properties = []
+    for _ in range(HOTEL_SEARCH_PAGES):
+        results = await serpapi_search(params)
+        properties += results.get("properties") or []
+        next_token = results.get("serpapi_pagination", {}).get("next_page_token")
+        if not next_token:
+            break
+        params = {**params, "next_page_token": next_token}
+
+    if not properties:
+        print("🏨 [LOG] Motor 'google_hotels' não retornou resultados. Tentando fallback genérico...")
+        return await _search_hotels_fallback(city, api_key, link)
+
+    # Centro do destino para o critério de distância (só o índice local, sem chamada extra)
+    place = resolve_place(city)
+    centroid = (place.lat, place.lon) if place else None
 
+    # 3. LINK SEPARADO DO TEXTO
+    return build_page(city, budget, properties, centroid, link)
 
-def _search_hotels_fallback(city: str, budget: float, api_key: str, url: str) -> str:
+
+async def _search_hotels_fallback(city: str, api_key: str, link: Link) -> HotelSuggestionResult:
     """
     Fallback usando busca genérica, mas retornando o link direto correto.
+    Erros da API sobem para quem chama (e não são cacheados).
     """
     query_string = f"hotéis em {city} baratos"
-    
+
     params = {
         "api_key": api_key,
         "engine": "google",
@@ -88,16 +114,8 @@ def _search_hotels_fallback(city: str, budget: float, api_key: str, url: str) ->
         "hl": "pt"
     }
 
-    try:
-        client = serpapi.Client()
-        results = client.search(params)
-        organic = results.get("organic_results", [])
-        
-        res = f"Sugestões de hotéis em {city} (via busca genérica):\n"
-        for item in organic[:4]:
-            res += f"- {item.get('title')}: {item.get('snippet')}\n"
-            
-        res += f"\n🔗 **[Ver Hotéis e Reservar no Google Travel]({url})**"
-        return res
-    except Exception as e:
-        return f"Consulte os hotéis diretamente no link:\n🔗 [Ver Hotéis]({url})"
\ No newline at end of file
+    results = await serpapi_search(params)
+    organic = results.get("organic_results", [])
+
+    suggestions = tuple((shorten(item.get("title"), 80), shorten(item.get("snippet"))) for item in organic[:4])
+    return HotelSuggestionResult(city, suggestions, link)
@@ -0,0 +1,118 @@
+# tools/http.py
+import os
+import asyncio
+import threading
+import weakref
+import contextvars
+from typing import Any, Coroutine, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.tools.resilience import call_upstream
+
+# Timeouts explícitos: nenhuma chamada externa pode ficar pendurada indefinidamente
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+
+# Limites do pool de conexões (keep-alive) e por host
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+# Um AsyncClient só pode ser usado no loop em que foi criado, por isso
+# guardamos um cliente (e os semáforos por host) para cada event loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP compartilhado do event loop atual (criado sob demanda)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            headers={"User-Agent": "travel-planner-agent"},
+        )
+        _clients[loop] = client
+    return client
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limits = _host_limits.setdefault(loop, {})
+    host = urlsplit(url).hostname or ""
+    if host not in limits:
+        limits[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return limits[host]
+
+
+def _upstream_key(url: str, params: Optional[dict]) -> str:
+    # Na SerpAPI cada motor (google_flights, google_hotels...) tem latência e falhas próprias
+    key = urlsplit(url).hostname or ""
+    if params and params.get("engine"):
+        key += f"/{params['engine']}"
+    return key
+
+
+async def get_json(url: str, params: Optional[dict] = None) -> Any:
+    """GET assíncrono que retorna o JSON da resposta. Erros HTTP viram exceção."""
+    async def attempt():
+        async with _host_semaphore(url):
+            response = await get_client().get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    # Circuit breaker, prazo da ferramenta e hedging (ver tools/resilience.py)
+    return await call_upstream(_upstream_key(url, params), attempt)
+
+
+# Contador de chamadas à SerpAPI da task atual (o aquecimento do cache mede o gasto por ele)
+serpapi_meter: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("serpapi_meter", default=None)
+
+
+async def serpapi_search(params: dict) -> dict:
+    """Equivalente assíncrono de serpapi.Client().search(params)."""
+    meter = serpapi_meter.get()
+    if meter is not None:
+        meter[0] += 1
+    # Parâmetros None são descartados (o cliente oficial faz o mesmo via requests)
+    return await get_json(SERPAPI_URL, {k: v for k, v in params.items() if v is not None})
+
+
+async def aclose():
+    """Fecha o cliente do event loop atual (chamado no shutdown da aplicação)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+# --- Loop de fundo para os wrappers síncronos ---
+# As funções síncronas das ferramentas (para scripts fora do servidor) delegam para as
+# versões assíncronas rodando neste loop, que mantém seu próprio pool de conexões.
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_sync_loop.run_forever, name="tools-http-loop", daemon=True)
+            thread.start()
+        return _sync_loop
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """Executa uma corrotina no loop de fundo e bloqueia até o resultado."""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_sync_loop())
+    return future.result()
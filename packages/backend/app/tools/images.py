@@ -1,24 +1,41 @@
 # tools/images.py
 import os
-import serpapi
-from functools import lru_cache
+from typing import Union
+from app.tools.cache import cached
+from app.tools.http import serpapi_search, run_sync
+from app.tools.resilience import with_deadline
+from app.tools.results import ImageResult, Link, render
 
-@lru_cache(maxsize=32)
 def get_destination_images(query: str) -> str:
     """
     Busca URLs de imagens para um local turístico, hotel ou cidade usando o Google Images.
     Útil para ilustrar o plano de viagem.
     """
+    return run_sync(get_destination_images_async(query))
+
+async def get_destination_images_async(query: str) -> str:
+    """Versão assíncrona de get_destination_images."""
     print(f"🖼️ [LOG] Buscando imagens para: '{query}'...")
-    
+
     api_key = os.getenv("SERPAPI_API_KEY")
     if not api_key:
         # Se não tiver chave, retorna vazio silenciosamente para não quebrar o agente
         print("⚠️ SERPAPI_API_KEY não encontrada ao buscar imagens.")
         return ""
 
+    try:
+        result = await with_deadline("images", _search_images(query))
+        return render(result) if isinstance(result, ImageResult) else result
+
+    except Exception as e:
+        print(f"❌ Erro ao buscar imagens: {e}")
+        return ""
+
+@cached("images", places=("query",))
+async def _search_images(query: str) -> Union[ImageResult, str]:
+    """Consulta o Google Images via SerpAPI. Lança exceção em caso de falha (não cacheada)."""
     params = {
-        "api_key": api_key,
+        "api_key": os.getenv("SERPAPI_API_KEY"),
         "engine": "google_images",
         "q": query,
         "num": 3, # Pega 3 imagens para ter opções
@@ -26,23 +43,17 @@ def get_destination_images(query: str) -> str:
         "hl": "pt"
     }
 
-    try:
-        client = serpapi.Client()
-        results = client.search(params)
-        images_results = results.get("images_results", [])
-        
-        if not images_results:
-            return "Nenhuma imagem encontrada."
-
-        # Extrai apenas as URLs originais
-        urls = [img["original"] for img in images_results if "original" in img]
-        
-        if not urls:
-            return "Nenhuma URL de imagem válida encontrada."
-
-        # Retorna formatado para o LLM
-        return f"Imagens encontradas para '{query}' (use estas URLs no Markdown): " + ", ".join(urls)
+    results = await serpapi_search(params)
+    images_results = results.get("images_results", [])
 
-    except Exception as e:
-        print(f"❌ Erro ao buscar imagens: {e}")
-        return ""
\ No newline at end of file
+    if not images_results:
+        return "Nenhuma imagem encontrada."
+
+    # Extrai apenas as URLs originais
+    urls = [img["original"] for img in images_results if "original" in img]
+
+    if not urls:
+        return "Nenhuma URL de imagem válida encontrada."
+
+    # O modelo vê só marcadores curtos; as URLs entram como imagens Markdown na saída final
+    return ImageResult(query, tuple(Link.make("img", query, url, image=True) for url in urls))
@@ -0,0 +1,154 @@
+# tools/ranking.py
+# Ranking local de hotéis. Em vez de pedir à SerpAPI "os mais baratos" e ficar com os
+# 5 primeiros, buscamos a página completa de propriedades e pontuamos todas de uma vez
+# (numpy, vetorizado): preço em relação ao orçamento por noite, nota, número de
+# avaliações e distância até o centro do destino. Os pesos são configuráveis no
+# servidor (HOTEL_WEIGHT_*) e por pedido (campo hotelWeights do TravelRequest).
+import os
+import contextvars
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.tools.results import Hotel, HotelResult, Link, shorten
+
+# Pelo menos 1: com 0 o agente não receberia nenhum hotel
+HOTEL_TOP_N = max(1, int(os.getenv("HOTEL_TOP_N", "5")))
+# Distância (km) em que o componente de localização vale metade
+HOTEL_DISTANCE_HALF_KM = float(os.getenv("HOTEL_DISTANCE_HALF_KM", "2"))
+
+EARTH_RADIUS_KM = 6371.0
+
+# Componente de preço de um hotel sem preço: o mesmo de um hotel bem acima do orçamento
+# (sem isso o NaN viraria 0 e ele passaria à frente de hotéis com preço conhecido)
+MISSING_PRICE_SCORE = -1.0
+
+
+@dataclass(frozen=True, slots=True)
+class RankingWeights:
+    price: float = float(os.getenv("HOTEL_WEIGHT_PRICE", "1.0"))
+    rating: float = float(os.getenv("HOTEL_WEIGHT_RATING", "1.0"))
+    reviews: float = float(os.getenv("HOTEL_WEIGHT_REVIEWS", "0.5"))
+    distance: float = float(os.getenv("HOTEL_WEIGHT_DISTANCE", "0.7"))
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict[str, float]]) -> "RankingWeights":
+        """Pesos do pedido sobre os padrões do servidor (chaves desconhecidas são ignoradas)."""
+        if not values:
+            return cls()
+        return cls(**{k: float(v) for k, v in values.items() if k in cls.__dataclass_fields__})
+
+
+# Pesos do pedido de plano em curso (as ferramentas são chamadas pelo agente, sem esse argumento)
+current_weights: contextvars.ContextVar[Optional[RankingWeights]] = contextvars.ContextVar("hotel_weights", default=None)
+
+
+@dataclass(frozen=True, slots=True)
+class HotelPage:
+    """Candidatos de uma busca, em colunas (NaN onde o campo não veio). É o que fica no cache."""
+    city: str
+    budget: float
+    names: Tuple[str, ...]
+    prices: np.ndarray
+    ratings: np.ndarray
+    reviews: np.ndarray
+    lats: np.ndarray
+    lons: np.ndarray
+    centroid: Optional[Tuple[float, float]]
+    link: Link
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def build_page(city: str, budget: float, properties: list, centroid: Optional[Tuple[float, float]], link: Link) -> HotelPage:
+    """Converte as propriedades da SerpAPI em colunas numéricas."""
+    columns = [
+        (
+            shorten(item.get("name", ""), 80),
+            _number(item.get("rate_per_night", {}).get("extracted_lowest", item.get("extracted_price"))),
+            _number(item.get("overall_rating")),
+            _number(item.get("reviews")),
+            _number(item.get("gps_coordinates", {}).get("latitude")),
+            _number(item.get("gps_coordinates", {}).get("longitude")),
+        )
+        for item in properties
+    ]
+    names, prices, ratings, reviews, lats, lons = zip(*columns) if columns else ((),) * 6
+    as_array = lambda values: np.array(values, dtype=np.float64)
+    return HotelPage(city, budget, tuple(names), as_array(prices), as_array(ratings), as_array(reviews),
+                     as_array(lats), as_array(lons), centroid, link)
+
+
+def distances_km(lats: np.ndarray, lons: np.ndarray, center: Tuple[float, float]) -> np.ndarray:
+    """Distância haversine de cada ponto até o centro."""
+    lat1, lon1 = np.radians(lats), np.radians(lons)
+    lat2, lon2 = np.radians(center[0]), np.radians(center[1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def score(page: HotelPage, weights: RankingWeights) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pontuação de cada candidato (maior é melhor) e a distância em km. Preço ausente é
+    penalizado (MISSING_PRICE_SCORE); os outros campos ausentes valem 0.
+    """
+    prices = page.prices
+    if page.budget > 0:
+        # 1 = de graça, 0 = exatamente no orçamento, negativo = acima do orçamento
+        price_score = np.clip(1 - prices / page.budget, -1, 1)
+    else:
+        price_score = 1 - prices / np.nanmax(prices) if np.isfinite(prices).any() else np.zeros_like(prices)
+    price_score = np.where(np.isnan(prices), MISSING_PRICE_SCORE, price_score)
+
+    rating_score = np.clip((page.ratings - 3) / 2, 0, 1)
+
+    max_reviews = np.nanmax(page.reviews) if np.isfinite(page.reviews).any() else 0
+    reviews_score = np.log1p(page.reviews) / np.log1p(max_reviews) if max_reviews > 0 else np.zeros_like(page.reviews)
+
+    # Centro do destino: índice de geocodificação ou, na falta dele, a mediana dos hotéis
+    center = page.centroid
+    if center is None and np.isfinite(page.lats).any():
+        center = (float(np.nanmedian(page.lats)), float(np.nanmedian(page.lons)))
+    distance = distances_km(page.lats, page.lons, center) if center else np.full_like(prices, np.nan)
+    distance_score = 1 / (1 + distance / HOTEL_DISTANCE_HALF_KM)
+
+    total = (
+        weights.price * np.nan_to_num(price_score)
+        + weights.rating * np.nan_to_num(rating_score)
+        + weights.reviews * np.nan_to_num(reviews_score)
+        + weights.distance * np.nan_to_num(distance_score)
+    )
+    return total, distance
+
+
+def rank(page: HotelPage, weights: Optional[RankingWeights] = None, top_n: int = HOTEL_TOP_N) -> HotelResult:
+    """Os top N candidatos da página, já no formato compacto das ferramentas."""
+    weights = weights or current_weights.get() or RankingWeights()
+    if not page.names or top_n <= 0:
+        return HotelResult(page.city, page.budget, (), page.link)
+
+    total, distance = score(page, weights)
+    top_n = min(top_n, len(total))
+    best = np.argpartition(-total, top_n - 1)[:top_n]
+    best = best[np.argsort(-total[best])]
+
+    def fmt(value: float, template: str) -> str:
+        return template.format(value) if np.isfinite(value) else "N/A"
+
+    hotels = tuple(
+        Hotel(
+            page.names[i],
+            fmt(page.prices[i], "R${:.0f}"),
+            fmt(page.ratings[i], "{:.1f}"),
+            fmt(page.reviews[i], "{:.0f}"),
+            fmt(distance[i], "{:.1f}km"),
+        )
+        for i in best
+    )
+    return HotelResult(page.city, page.budget, hotels, page.link)
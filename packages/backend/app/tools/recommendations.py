@@ -1,65 +1,72 @@
 # tools/recommendations.py
 import os
-import serpapi
 import urllib.parse
 from typing import Optional
+from app.tools.cache import cached
+from app.tools.http import serpapi_search, run_sync
+from app.tools.resilience import with_deadline
+from app.tools.results import Link, Recommendation, RecommendationResult, shorten, render, render_unavailable
+
+def _build_maps_url(city: str, category: str) -> str:
+    """Cria uma URL de busca no Maps (ex: "atrações turísticas em Paris")."""
+    query_maps = f"top attractions in {city} {category}"
+    encoded_query = urllib.parse.quote(query_maps)
+    return f"https://www.google.com/maps/search/{encoded_query}?hl=pt-BR"
 
 def get_recommendations(city: str, category: str) -> str:
     """
     Busca recomendações e gera um link direto para o Google Maps.
     """
-    
+    return run_sync(get_recommendations_async(city, category))
+
+async def get_recommendations_async(city: str, category: str) -> str:
+    """Versão assíncrona de get_recommendations."""
+
     print(f"🗺️ [LOG] Buscando recomendações '{category}' em {city}...")
 
     api_key = os.getenv("SERPAPI_API_KEY")
     if not api_key:
         raise ValueError("SERPAPI_API_KEY não configurada no .env")
 
+    try:
+        return render(await with_deadline("recommendations", _search_recommendations(city, category)))
+    except Exception as e:
+        if isinstance(e, ValueError):
+             raise e
+        print(f"❌ Erro na API de recomendações: {e}")
+        # Fallback robusto com o link do Maps
+        return render_unavailable("recomendacoes", _maps_link(city, category))
+
+def _maps_link(city: str, category: str) -> Link:
     # --- MELHORIA 2: Link direto para o Google Maps ---
-    # Cria uma URL de busca no Maps (ex: "atrações turísticas em Paris")
-    query_maps = f"top attractions in {city} {category}"
-    encoded_query = urllib.parse.quote(query_maps)
-    google_maps_url = f"https://www.google.com/maps/search/{encoded_query}?hl=pt-BR"
+    return Link.make("maps", "Explorar Atrações no Mapa (Google Maps)", _build_maps_url(city, category))
 
+@cached("recommendations", places=("city",))
+async def _search_recommendations(city: str, category: str) -> RecommendationResult:
+    """Busca roteiros na SerpAPI. Lança exceção em caso de falha (não cacheada)."""
     # Busca na API (mantém a lógica original de busca web/places para texto)
     query = f"roteiro de viagem {category} em {city} dicas"
-    
+
     params = {
-        "api_key": api_key,
+        "api_key": os.getenv("SERPAPI_API_KEY"),
         "engine": "google",
         "q": query,
         "gl": "br",
         "hl": "pt"
     }
 
-    try:
-        client = serpapi.Client()
-        results = client.search(params)
-        
-        organic_results = results.get("organic_results", [])
+    results = await serpapi_search(params)
 
-        if not organic_results:
-            raise Exception(f"Nenhuma recomendação encontrada para '{query}'.")
+    organic_results = results.get("organic_results", [])
 
-        result = f"Recomendações e Roteiros para {category} em {city}:\n"
+    if not organic_results:
+        raise Exception(f"Nenhuma recomendação encontrada para '{query}'.")
 
-        for item in organic_results[:4]: # Pega os 4 primeiros
-            title = item.get("title", "")
-            link = item.get("link", "")
-            snippet = item.get("snippet", "")
-            
-            result += f"- {title}\n"
-            if snippet:
-                result += f"  '{snippet}'\n"
-            result += f"  🔗 {link}\n"
-        
-        # Adiciona o link do Maps no final da resposta
-        result += f"\n🔗 **[Explorar Atrações no Mapa (Google Maps)]({google_maps_url})**"
-            
-        return result
-    except Exception as e:
-        if isinstance(e, ValueError):
-             raise e
-        print(f"❌ Erro na API de recomendações: {e}")
-        # Fallback robusto com o link do Maps
-        return f"Não foi possível carregar detalhes textuais, mas você pode explorar o mapa:\n🔗 [Ver Atrações no Google Maps]({google_maps_url})"
\ No newline at end of file
+    items = []
+    for item in organic_results[:4]: # Pega os 4 primeiros
+        title = shorten(item.get("title", ""), 80)
+        link = Link.make("rec", title, item.get("link", ""))
+        items.append(Recommendation(title, shorten(item.get("snippet", "")), link))
+
+    # O link do Maps vai separado, para a resposta final
+    return RecommendationResult(city, category, tuple(items), _maps_link(city, category))
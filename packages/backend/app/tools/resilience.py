@@ -0,0 +1,227 @@
+# tools/resilience.py
+# Camada de resiliência das chamadas externas (SerpAPI, Open-Meteo, ERA5).
+# - Prazo por ferramenta: passado o prazo, a ferramenta devolve o texto de fallback
+#   (só o link) em vez de segurar o plano.
+# - Circuit breaker por upstream: depois de CIRCUIT_FAILURE_THRESHOLD falhas seguidas,
+#   as chamadas falham na hora (e caem no fallback) durante CIRCUIT_RESET_TIMEOUT
+#   segundos; depois uma única chamada de teste decide se o circuito fecha.
+# - Requisições "hedged" (opcional): se a resposta demora mais que o p95 recente do
+#   upstream, dispara uma segunda tentativa idêntica e fica com a que chegar primeiro.
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+# Prazo total de cada ferramenta, em segundos
+DEFAULT_TOOL_DEADLINE = 15.0
+TOOL_DEADLINES: Dict[str, float] = {
+    "flights": float(os.getenv("TOOL_DEADLINE_FLIGHTS", "15")),
+    "hotels": float(os.getenv("TOOL_DEADLINE_HOTELS", "15")),
+    "recommendations": float(os.getenv("TOOL_DEADLINE_RECOMMENDATIONS", "10")),
+    "images": float(os.getenv("TOOL_DEADLINE_IMAGES", "8")),
+    # Inclui a geocodificação e, na primeira consulta de uma região, o download do ERA5
+    "weather": float(os.getenv("TOOL_DEADLINE_WEATHER", "20")),
+}
+# Folga para a chamada HTTP estourar (e contar como falha) antes do prazo da ferramenta
+DEADLINE_MARGIN = 0.1
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Hedging gasta cota extra da SerpAPI quando dispara, por isso é opcional
+HEDGING_ENABLED = os.getenv("HTTP_HEDGING", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("HTTP_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("tool_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """O upstream está com o circuito aberto: a chamada nem é feita."""
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Só erros do upstream abrem o circuito (não erros de parâmetros, como um 400)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.short_circuited = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_abort(self):
+        """Chamada cancelada por quem pediu: não diz nada sobre a saúde do upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class Upstream:
+    """Estado de um upstream: circuit breaker e latências recentes das respostas bem-sucedidas."""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict:
+        p95 = self.quantile(0.95)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "opened": self.breaker.opened,
+            "short_circuited": self.breaker.short_circuited,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(key: str) -> Upstream:
+    with _upstreams_lock:
+        if key not in _upstreams:
+            _upstreams[key] = Upstream()
+        return _upstreams[key]
+
+
+async def with_deadline(tool: str, coro: Awaitable[Any]) -> Any:
+    """Executa a busca de uma ferramenta com o prazo dela (TimeoutError ao estourar)."""
+    timeout = TOOL_DEADLINES.get(tool, DEFAULT_TOOL_DEADLINE)
+    # As chamadas HTTP feitas dentro do prazo enxergam o limite pela contextvar
+    token = _deadline.set(asyncio.get_running_loop().time() + timeout)
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    finally:
+        _deadline.reset(token)
+
+
+async def _timed(upstream: Upstream, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    start = time.monotonic()
+    result = await attempt()
+    upstream.latencies.append(time.monotonic() - start)
+    return result
+
+
+async def _hedged(upstream: Upstream, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    delay = upstream.quantile(HEDGE_QUANTILE)
+    if delay is None:
+        return await _timed(upstream, attempt)
+
+    tasks = [asyncio.create_task(_timed(upstream, attempt))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+
+        # Resposta mais lenta que o p95: segunda tentativa em paralelo
+        upstream.hedges += 1
+        tasks.append(asyncio.create_task(_timed(upstream, attempt)))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is tasks[1]:
+                        upstream.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call_upstream(key: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Executa `attempt` (uma requisição idempotente) protegida pelo circuit breaker do
+    upstream, limitada ao prazo da ferramenta em curso e, se ativado, com hedging.
+    """
+    upstream = get_upstream(key)
+    if not upstream.breaker.allow():
+        raise CircuitOpenError(f"Circuito aberto para {key}")
+
+    remaining = None
+    deadline = _deadline.get()
+    if deadline is not None:
+        remaining = deadline - asyncio.get_running_loop().time() - DEADLINE_MARGIN
+        if remaining <= 0:
+            # O prazo foi consumido antes desta chamada: não é culpa do upstream
+            upstream.breaker.record_abort()
+            raise asyncio.TimeoutError(f"Prazo esgotado antes de chamar {key}")
+
+    call = _hedged(upstream, attempt) if HEDGING_ENABLED else _timed(upstream, attempt)
+    try:
+        result = await asyncio.wait_for(call, remaining)
+    except asyncio.CancelledError:
+        upstream.breaker.record_abort()
+        raise
+    except Exception as e:
+        if _is_upstream_failure(e):
+            upstream.breaker.record_failure()
+        else:
+            upstream.breaker.record_abort()
+        raise
+    upstream.breaker.record_success()
+    return result
+
+
+def stats() -> dict:
+    with _upstreams_lock:
+        return {key: upstream.stats() for key, upstream in _upstreams.items()}
@@ -0,0 +1,283 @@
+# tools/results.py
+# Resultados estruturados e compactos das ferramentas.
+# O agente relê a saída de cada ferramenta como tokens de entrada em todos os turnos
+# seguintes. Por isso as ferramentas devolvem registros com só os campos úteis,
+# renderizados em texto enxuto, sem emojis nem frases repetidas. Os links profundos
+# (URLs longas do Google Flights/Travel/Maps) não vão para o prompt: no lugar deles
+# o modelo recebe um marcador curto como [[link:hotels-3fa9c2]], que o stream do plano
+# troca pelo link em Markdown na saída final (ver LinkResolver).
+import re
+import hashlib
+import contextvars
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SNIPPET_MAX_CHARS = 160
+# Um "[[" sem fechamento por mais que isso não é marcador: o texto segue sem esperar
+MAX_PENDING_CHARS = 64
+
+LINK_PATTERN = re.compile(r"\[\[link:([\w-]+)\]\]")
+
+
+def shorten(text: str, limit: int = SNIPPET_MAX_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+@dataclass(frozen=True, slots=True)
+class Link:
+    key: str
+    caption: str
+    url: str
+    image: bool = False
+
+    @classmethod
+    def make(cls, prefix: str, caption: str, url: str, image: bool = False) -> "Link":
+        # Chave curta e estável: o mesmo link tem a mesma chave em qualquer pedido
+        return cls(f"{prefix}-{hashlib.sha1(url.encode()).hexdigest()[:6]}", caption, url, image)
+
+    def ref(self) -> str:
+        return f"[[link:{self.key}]]"
+
+    def markdown(self) -> str:
+        return f"{'!' if self.image else ''}[{self.caption}]({self.url})"
+
+
+# --- Registros por ferramenta ---
+
+@dataclass(frozen=True, slots=True)
+class FlightOption:
+    title: str
+    snippet: str
+
+
+@dataclass(frozen=True, slots=True)
+class FlightResult:
+    origin: str
+    destination: str
+    date: str
+    return_date: Optional[str]
+    options: Tuple[FlightOption, ...]
+    link: Link
+
+    def lines(self) -> List[str]:
+        dates = f"{self.date}/{self.return_date}" if self.return_date else self.date
+        lines = [f"voos {self.origin}>{self.destination} {dates}"]
+        lines += [f"- {o.title}: {o.snippet}" for o in self.options]
+        return lines + [f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+@dataclass(frozen=True, slots=True)
+class FlightOffer:
+    """Uma oferta do motor google_flights (preço total em BRL, duração em minutos)."""
+    airline: str
+    price: Optional[int]
+    duration_min: Optional[int]
+    stops: int
+    departure: str
+    arrival: str
+
+    def line(self) -> str:
+        price = f"R${self.price}" if self.price is not None else "N/A"
+        duration = f"{self.duration_min // 60}h{self.duration_min % 60:02d}" if self.duration_min else "N/A"
+        return f"- {self.airline}|{price}|{duration}|{self.stops}|{self.departure}>{self.arrival}"
+
+
+@dataclass(frozen=True, slots=True)
+class FlightOffersResult:
+    origin: str
+    destination: str
+    date: str
+    return_date: Optional[str]
+    departure_ids: Tuple[str, ...]
+    arrival_ids: Tuple[str, ...]
+    offers: Tuple[FlightOffer, ...]
+    link: Link
+
+    def lines(self) -> List[str]:
+        dates = f"{self.date}/{self.return_date} (preço ida e volta)" if self.return_date else self.date
+        route = f"{self.origin}({','.join(self.departure_ids)})>{self.destination}({','.join(self.arrival_ids)})"
+        lines = [f"voos {route} {dates} (cia|preço|duração|escalas|partida>chegada)"]
+        lines += [offer.line() for offer in self.offers]
+        return lines + [f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+@dataclass(frozen=True, slots=True)
+class Hotel:
+    name: str
+    price: str
+    rating: str
+    reviews: str = "N/A"
+    distance: str = "N/A"
+
+
+@dataclass(frozen=True, slots=True)
+class HotelResult:
+    city: str
+    budget: float
+    hotels: Tuple[Hotel, ...]
+    link: Link
+
+    def lines(self) -> List[str]:
+        lines = [f"hoteis {self.city} max R${self.budget:g}/noite (nome|preço|nota|avaliações|dist. centro)"]
+        lines += [f"- {h.name}|{h.price}|{h.rating}|{h.reviews}|{h.distance}" for h in self.hotels]
+        return lines + [f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+@dataclass(frozen=True, slots=True)
+class HotelSuggestionResult:
+    """Resultado do fallback por busca genérica (sem preços estruturados)."""
+    city: str
+    suggestions: Tuple[Tuple[str, str], ...]
+    link: Link
+
+    def lines(self) -> List[str]:
+        lines = [f"hoteis {self.city} (busca web)"] + [f"- {t}: {s}" for t, s in self.suggestions]
+        return lines + [f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+@dataclass(frozen=True, slots=True)
+class Recommendation:
+    title: str
+    snippet: str
+    link: Link
+
+
+@dataclass(frozen=True, slots=True)
+class RecommendationResult:
+    city: str
+    category: str
+    items: Tuple[Recommendation, ...]
+    link: Link
+
+    def lines(self) -> List[str]:
+        lines = [f"recomendacoes {self.category} {self.city}"]
+        lines += [f"- {i.title}: {i.snippet} {i.link.ref()}" for i in self.items]
+        return lines + [f"mapa: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,) + tuple(i.link for i in self.items)
+
+
+@dataclass(frozen=True, slots=True)
+class WeatherResult:
+    city: str
+    start: str
+    end: str
+    temperature: float
+    rain: str
+    years: int
+    link: Link
+
+    def lines(self) -> List[str]:
+        return [f"clima {self.city} {self.start}..{self.end} (média {self.years} anos): "
+                f"{self.temperature:.1f}°C, chuva {self.rain}", f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+@dataclass(frozen=True, slots=True)
+class ImageResult:
+    query: str
+    images: Tuple[Link, ...]
+
+    def lines(self) -> List[str]:
+        return [f"imagens {self.query}: " + " ".join(i.ref() for i in self.images)]
+
+    def links(self) -> Tuple[Link, ...]:
+        return self.images
+
+
+# --- Renderização ---
+
+class LinkResolver:
+    """
+    Links de um pedido de plano. As ferramentas registram os links; o texto do modelo
+    passa por feed() e os marcadores [[link:...]] viram Markdown. Um marcador pode vir
+    partido entre dois pedaços do stream, por isso o final incompleto fica retido.
+    """
+
+    def __init__(self, links: Iterable[Link] = ()):
+        self._links: Dict[str, Link] = {link.key: link for link in links}
+        self._pending = ""
+
+    def register(self, link: Link):
+        self._links[link.key] = link
+
+    def snapshot(self) -> Dict[str, list]:
+        """Links registrados em forma serializável (guardados no estado da sessão)."""
+        return {key: [link.caption, link.url, link.image] for key, link in self._links.items()}
+
+    @classmethod
+    def from_snapshot(cls, data: Optional[Dict[str, list]]) -> "LinkResolver":
+        """Resolver com os links de turnos anteriores: um ajuste pode repetir os marcadores."""
+        return cls(Link(key, *fields) for key, fields in (data or {}).items())
+
+    def _expand(self, text: str) -> str:
+        def replace(match):
+            link = self._links.get(match.group(1))
+            return link.markdown() if link else match.group(0)
+        return LINK_PATTERN.sub(replace, text)
+
+    def feed(self, text: str) -> str:
+        text = self._pending + text
+        cut = len(text)
+        start = text.rfind("[[")
+        if start != -1 and "]]" not in text[start:] and len(text) - start < MAX_PENDING_CHARS:
+            cut = start
+        elif text.endswith("["):
+            cut = len(text) - 1
+        self._pending = text[cut:]
+        return self._expand(text[:cut])
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return self._expand(text)
+
+
+current_links: contextvars.ContextVar[Optional[LinkResolver]] = contextvars.ContextVar("current_links", default=None)
+
+
+def render(result) -> str:
+    """
+    Texto compacto para o modelo. Dentro de um pedido de plano os links viram marcadores
+    (e são registrados para a saída final); fora dele, vão em Markdown direto.
+    """
+    text = "\n".join(result.lines())
+    resolver = current_links.get()
+    if resolver is None:
+        by_key = {link.key: link for link in result.links()}
+        return LINK_PATTERN.sub(lambda m: by_key[m.group(1)].markdown(), text)
+    for link in result.links():
+        resolver.register(link)
+    return text
+
+
+@dataclass(frozen=True, slots=True)
+class _Unavailable:
+    tool: str
+    link: Link
+
+    def lines(self) -> List[str]:
+        return [f"{self.tool}: sem dados da API agora; indique o link ao usuário", f"link: {self.link.ref()}"]
+
+    def links(self) -> Tuple[Link, ...]:
+        return (self.link,)
+
+
+def render_unavailable(tool: str, link: Link) -> str:
+    """Fallback quando a API falha ou o circuito está aberto: só o link."""
+    return render(_Unavailable(tool, link))
@@ -0,0 +1,258 @@
+# Aquecimento do cache das ferramentas para os destinos mais pedidos.
+# O tráfego se concentra em poucas dezenas de destinos e janelas de datas, mas o
+# primeiro usuário de cada manhã ainda paga o custo frio de hotéis, recomendações,
+# imagens e clima. Aqui contamos os pedidos por destino (com decaimento, para seguir
+# a sazonalidade) e, fora do horário de pico, renovamos os resultados em cache dos
+# WARM_TOP_N destinos antes que vençam, dentro de um orçamento diário de chamadas à
+# SerpAPI. O /metrics mostra a cobertura e o frescor do cache desses destinos.
+import os
+import time
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app import schemas
+from app.admission import plan_admission
+from app.prefetch import DEFAULT_RECOMMENDATION_CATEGORY
+from app.tools.cache import tool_cache
+from app.tools.destinations import place_key
+from app.tools.hotels import HOTEL_SEARCH_PAGES, _search_hotels
+from app.tools.http import serpapi_meter
+from app.tools.images import _search_images
+from app.tools.recommendations import _search_recommendations
+from app.tools.resilience import with_deadline
+from app.tools.weather import _historical_weather
+
+WARM_CACHE_ENABLED = os.getenv("WARM_CACHE", "true").lower() in ("1", "true", "yes")
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "20"))
+# Chamadas à SerpAPI por dia reservadas ao aquecimento
+WARM_SERPAPI_DAILY_BUDGET = int(os.getenv("WARM_SERPAPI_DAILY_BUDGET", "50"))
+# Horas fora de pico (hora local do servidor, "início-fim"; "22-6" atravessa a meia-noite)
+WARM_OFFPEAK_HOURS = os.getenv("WARM_OFFPEAK_HOURS", "1-6")
+# Intervalo entre as rodadas do agendador, em segundos
+WARM_INTERVAL = float(os.getenv("WARM_INTERVAL", "600"))
+# Renova a entrada quando resta menos que esta fração do TTL
+WARM_REFRESH_AHEAD = float(os.getenv("WARM_REFRESH_AHEAD", "0.25"))
+# Última rodada da noite: tantos segundos antes do fim da janela fora de pico
+WARM_FINAL_PASS_LEAD = float(os.getenv("WARM_FINAL_PASS_LEAD", "300"))
+# Meia-vida da popularidade de um destino, em horas
+WARM_POPULARITY_HALF_LIFE = float(os.getenv("WARM_POPULARITY_HALF_LIFE", "72"))
+
+MAX_TRACKED_DESTINATIONS = 1000
+# Janelas de datas (check-in, check-out, orçamento) guardadas por destino
+MAX_WINDOWS_PER_DESTINATION = 3
+# Pausa entre duas renovações, para não disputar o upstream com os usuários
+CALL_SPACING = 1.0
+
+
+def _parse_hours(spec: str) -> Tuple[int, int]:
+    start, end = spec.split("-")
+    return int(start) % 24, int(end) % 24
+
+
+def is_off_peak(now: Optional[datetime] = None) -> bool:
+    start, end = _parse_hours(WARM_OFFPEAK_HOURS)
+    hour = (now or datetime.now()).hour
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+def seconds_until_peak(now: Optional[datetime] = None) -> float:
+    """Segundos até o fim da janela fora de pico (hora local)."""
+    now = now or datetime.now()
+    _, end = _parse_hours(WARM_OFFPEAK_HOURS)
+    peak = now.replace(hour=end, minute=0, second=0, microsecond=0)
+    if peak <= now:
+        peak += timedelta(days=1)
+    return (peak - now).total_seconds()
+
+
+class _Destination:
+    __slots__ = ("key", "name", "score", "updated_at", "windows")
+
+    def __init__(self, key: str, name: str):
+        self.key = key
+        self.name = name
+        self.score = 0.0
+        self.updated_at = time.monotonic()
+        # (check-in, check-out, orçamento por noite) -> popularidade
+        self.windows: Dict[Tuple[str, str, float], float] = {}
+
+    def decayed(self, now: float) -> float:
+        return self.score * 0.5 ** ((now - self.updated_at) / (WARM_POPULARITY_HALF_LIFE * 3600))
+
+
+class CacheWarmer:
+    def __init__(self):
+        self._destinations: Dict[str, _Destination] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._budget_day: Optional[date] = None
+        self.budget_used = 0
+        self.refreshed = 0
+        self.failures = 0
+        self.runs = 0
+        self.last_run: Optional[str] = None
+
+    # --- Popularidade ---
+
+    def record(self, request: schemas.TravelRequest):
+        """Conta um pedido de plano para o destino (chamado pelo /generate-plan)."""
+        key = place_key(request.destination)
+        now = time.monotonic()
+        entry = self._destinations.get(key)
+        if entry is None:
+            entry = self._destinations[key] = _Destination(key, request.destination.strip())
+            if len(self._destinations) > MAX_TRACKED_DESTINATIONS:
+                coldest = min(self._destinations.values(), key=lambda d: d.decayed(now))
+                del self._destinations[coldest.key]
+        entry.score = entry.decayed(now) + 1
+        entry.updated_at = now
+
+        window = (request.departureDate, request.returnDate or request.departureDate, round(request.nightlyBudget, 2))
+        entry.windows[window] = entry.windows.get(window, 0) + 1
+        if len(entry.windows) > MAX_WINDOWS_PER_DESTINATION:
+            del entry.windows[min(entry.windows, key=entry.windows.get)]
+
+    def top(self, n: int = WARM_TOP_N) -> List[_Destination]:
+        now = time.monotonic()
+        return sorted(self._destinations.values(), key=lambda d: d.decayed(now), reverse=True)[:n]
+
+    # --- Renovação ---
+
+    def _jobs(self, destination: _Destination) -> list:
+        """(nome, função em cache, argumentos, custo estimado em chamadas à SerpAPI)."""
+        today = date.today().isoformat()
+        jobs = [
+            ("recommendations", _search_recommendations, (destination.name, DEFAULT_RECOMMENDATION_CATEGORY), 1),
+            ("images", _search_images, (destination.name,), 1),
+        ]
+        # Só janelas que ainda não passaram (a mais pedida primeiro)
+        for (check_in, check_out, budget), _ in sorted(destination.windows.items(), key=lambda w: -w[1]):
+            if check_in >= today:
+                jobs.append(("hotels", _search_hotels, (destination.name, check_in, check_out, budget), HOTEL_SEARCH_PAGES))
+                # Clima vem das normais locais: não gasta SerpAPI
+                jobs.append(("weather", _historical_weather, (destination.name, check_in, check_out), 0))
+        return jobs
+
+    def _needs_refresh(self, func, args) -> bool:
+        remaining = tool_cache.remaining(func.cache_key(*args))
+        return remaining is None or remaining < WARM_REFRESH_AHEAD * func.ttl
+
+    def _reset_budget(self):
+        today = date.today()
+        if self._budget_day != today:
+            self._budget_day = today
+            self.budget_used = 0
+
+    async def run_once(self) -> int:
+        """Uma rodada de renovação; retorna quantas entradas foram renovadas."""
+        self._reset_budget()
+        self.runs += 1
+        self.last_run = datetime.now().isoformat(timespec="seconds")
+        refreshed = 0
+        meter = [0]
+        serpapi_meter.set(meter)
+
+        until_peak = seconds_until_peak()
+        for destination in self.top():
+            for tool, func, args, cost in self._jobs(destination):
+                if not self._needs_refresh(func, args):
+                    continue
+                # O TTL da ferramenta vale também aqui: uma entrada que venceria antes do pico
+                # (hotéis, 15 min) fica para a última rodada, logo antes de o pico começar
+                if func.ttl - until_peak < WARM_REFRESH_AHEAD * func.ttl:
+                    continue
+                # Sem orçamento, só o que não gasta SerpAPI (clima)
+                if cost and self.budget_used + cost > WARM_SERPAPI_DAILY_BUDGET:
+                    continue
+                # Pico de geração: deixa o upstream para os usuários
+                if plan_admission.active > plan_admission.max_concurrent // 2:
+                    return refreshed
+
+                before = meter[0]
+                try:
+                    await with_deadline(tool, func.refresh(*args))
+                    refreshed += 1
+                    self.refreshed += 1
+                except Exception as e:
+                    self.failures += 1
+                    print(f"⚠️ [LOG] Falha ao aquecer {tool} para {destination.name}: {e}")
+                # Conta o gasto real (uma busca de hotéis pode cair no fallback e gastar mais)
+                self.budget_used += max(meter[0] - before, 0)
+                await asyncio.sleep(CALL_SPACING)
+
+        if refreshed:
+            print(f"🔥 [LOG] Cache aquecido: {refreshed} entradas renovadas ({self.budget_used}/{WARM_SERPAPI_DAILY_BUDGET} chamadas hoje)")
+        return refreshed
+
+    async def _loop(self):
+        while True:
+            # Acorda também para a última rodada, WARM_FINAL_PASS_LEAD segundos antes do pico
+            delay = WARM_INTERVAL
+            until_peak = seconds_until_peak()
+            if is_off_peak() and until_peak > WARM_FINAL_PASS_LEAD:
+                delay = min(delay, until_peak - WARM_FINAL_PASS_LEAD)
+            await asyncio.sleep(delay)
+            if not is_off_peak():
+                continue
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [LOG] Erro no aquecimento do cache: {e}")
+
+    def start(self):
+        if WARM_CACHE_ENABLED and WARM_SERPAPI_DAILY_BUDGET > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- Relatório ---
+
+    def stats(self) -> dict:
+        """Cobertura (entradas em cache) e frescor (fração do TTL restante) dos destinos mais pedidos."""
+        self._reset_budget()
+        now = time.monotonic()
+        destinations = []
+        cached_entries = total_entries = 0
+        freshness_sum = 0.0
+        for destination in self.top():
+            tools = {}
+            for tool, func, args, _ in self._jobs(destination):
+                remaining = tool_cache.remaining(func.cache_key(*args))
+                total_entries += 1
+                if remaining is not None:
+                    cached_entries += 1
+                    freshness_sum += remaining / func.ttl
+                # Várias janelas de hotel/clima: vale a menos fresca (None = fora do cache)
+                fresh = round(remaining / func.ttl, 2) if remaining is not None else None
+                if tool not in tools or fresh is None or (tools[tool] is not None and fresh < tools[tool]):
+                    tools[tool] = fresh
+            destinations.append({
+                "destination": destination.key,
+                "popularity": round(destination.decayed(now), 2),
+                "freshness": tools,
+            })
+        return {
+            "enabled": self._task is not None,
+            "off_peak": is_off_peak(),
+            "tracked": len(self._destinations),
+            "coverage": round(cached_entries / total_entries, 3) if total_entries else None,
+            "avg_freshness": round(freshness_sum / cached_entries, 3) if cached_entries else None,
+            "budget": {"used_today": self.budget_used, "daily": WARM_SERPAPI_DAILY_BUDGET},
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "top": destinations,
+        }
+
+
+cache_warmer = CacheWarmer()
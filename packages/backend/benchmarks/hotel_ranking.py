@@ -0,0 +1,42 @@
+# Benchmark do ranking local de hotéis (app/tools/ranking.py): pontua uma página de
+# candidatos sintéticos e mede o tempo por ranking.
+#
+# Uso (a partir de packages/backend): python -m benchmarks.hotel_ranking [candidatos]
+import sys
+import time
+import random
+
+from app.tools.ranking import RankingWeights, build_page, rank
+from app.tools.results import Link, render
+
+
+def synthetic_properties(n: int) -> list:
+    rng = random.Random(42)
+    return [
+        {
+            "name": f"Hotel {i}",
+            "rate_per_night": {"extracted_lowest": rng.uniform(120, 900)},
+            "overall_rating": round(rng.uniform(2.5, 5.0), 1),
+            "reviews": rng.randint(0, 5000),
+            "gps_coordinates": {"latitude": 48.85 + rng.gauss(0, 0.03), "longitude": 2.35 + rng.gauss(0, 0.04)},
+        }
+        for i in range(n)
+    ]
+
+
+def main(n: int):
+    link = Link.make("hotels", "Ver Hotéis", "https://www.google.com/travel/hotels/Paris")
+    page = build_page("Paris", 450, synthetic_properties(n), (48.8566, 2.3522), link)
+
+    runs = 2000
+    for weights in (RankingWeights(), RankingWeights(price=2.0, distance=0.0)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = rank(page, weights)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{n} candidatos, {weights}: {elapsed * 1e6:.0f} µs/ranking")
+        print(render(result) + "\n")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
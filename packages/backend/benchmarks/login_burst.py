@@ -0,0 +1,45 @@
+# Benchmark de rajada de logins: quantas verificações bcrypt por segundo o
+# servidor consegue fazer, em linha (como era antes) e no pool de processos
+# com diferentes números de workers.
+#
+# Uso (a partir de packages/backend): python -m benchmarks.login_burst [logins]
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from app import passwords
+
+
+async def burst(pool: ProcessPoolExecutor, hashed: str, logins: int) -> float:
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        loop.run_in_executor(pool, passwords._verify_and_update, "senha-de-teste", hashed)
+        for _ in range(logins)
+    ])
+    return logins / (time.perf_counter() - start)
+
+
+async def main(logins: int):
+    hashed = passwords._hash("senha-de-teste")
+    print(f"bcrypt rounds={passwords.BCRYPT_ROUNDS}, {logins} logins simultâneos")
+
+    start = time.perf_counter()
+    for _ in range(logins):
+        passwords._verify_and_update("senha-de-teste", hashed)
+    print(f"  em linha (sem pool): {logins / (time.perf_counter() - start):8.1f} logins/s")
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Aquece o pool (criação dos processos não entra na medição)
+            await burst(pool, hashed, workers)
+            rate = await burst(pool, hashed, logins)
+        print(f"  pool com {workers:2d} workers:   {rate:8.1f} logins/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 32))
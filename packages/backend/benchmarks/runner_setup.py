@@ -0,0 +1,51 @@
+# Benchmark do custo de preparação por pedido do /generate-plan: construir um
+# Runner novo a cada requisição (como era antes) versus pegar um do pool, mais a
+# criação da sessão.
+#
+# Uso (a partir de packages/backend): python -m benchmarks.runner_setup [pedidos]
+import sys
+import time
+import uuid
+import asyncio
+
+from google.adk.runners import Runner
+
+from app.agent import booking_integrator, session_service
+from app.routers.plan import APP_NAME
+from app.runner_pool import RunnerPool
+
+
+def new_runner():
+    return Runner(agent=booking_integrator, app_name=APP_NAME, session_service=session_service)
+
+
+async def per_request(requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        runner = new_runner()
+        await session_service.create_session(app_name=APP_NAME, user_id="bench", session_id=uuid.uuid4().hex)
+        await runner.close()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def pooled(requests: int) -> float:
+    pool = RunnerPool(new_runner, size=4)
+    pool.warm()
+    start = time.perf_counter()
+    for _ in range(requests):
+        runner = pool.checkout()
+        await session_service.create_session(app_name=APP_NAME, user_id="bench", session_id=uuid.uuid4().hex)
+        await pool.release(runner)
+    elapsed = (time.perf_counter() - start) / requests * 1e6
+    await pool.close()
+    return elapsed
+
+
+async def main(requests: int):
+    print(f"{requests} pedidos em sequência (preparação antes da primeira chamada ao modelo)")
+    print(f"  Runner novo por pedido: {await per_request(requests):8.1f} µs/pedido")
+    print(f"  Runner do pool:         {await pooled(requests):8.1f} µs/pedido")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,131 @@
+# Benchmark de tokens por ferramenta: o texto que o modelo lê no formato antigo
+# (frases, emojis e URLs completas) versus o resultado compacto de app/tools/results.py.
+# As respostas da SerpAPI são simuladas (httpx.MockTransport) com dados realistas.
+#
+# Uso (a partir de packages/backend): python -m benchmarks.tool_tokens
+#
+# Com o tokenizer local do Gemini (pip install sentencepiece) a contagem é exata;
+# sem ele, usa uma aproximação (palavras + pontuação).
+import os
+import re
+import asyncio
+
+import httpx
+
+from app.tools import http
+from app.tools.flights import _build_flights_url, _search_flights
+from app.tools.hotels import _build_hotels_url, _search_hotels
+from app.tools.images import _search_images
+from app.tools.ranking import rank
+from app.tools.recommendations import _build_maps_url, _search_recommendations
+from app.tools.results import Link, LinkResolver, WeatherResult, current_links, render
+from app.tools.weather import _build_weather_url
+
+SNIPPET = ("Encontre passagens aéreas baratas com as melhores tarifas, compare preços de "
+           "companhias aéreas e reserve voos com flexibilidade de datas e bagagem incluída.")
+
+FIXTURES = {
+    "google": {"organic_results": [
+        {"title": f"Resultado {i} - Guia completo de viagem e dicas de especialistas", "snippet": SNIPPET,
+         "link": f"https://www.exemplo-de-blog-de-viagem.com.br/roteiros/paris/artigo-{i}?utm_source=google"}
+        for i in range(4)
+    ]},
+    "google_flights": {"best_flights": [
+        {"flights": [{"departure_airport": {"id": "GRU", "time": "2025-12-10 23:45"},
+                      "arrival_airport": {"id": "CDG", "time": "2025-12-11 15:20"}, "airline": "Air France"}],
+         "total_duration": 695, "price": 4210 + 300 * i}
+        for i in range(3)
+    ]},
+    "google_hotels": {"properties": [
+        {"name": f"Hôtel Le Marais Boutique & Spa {i}", "rate_per_night": {"lowest": f"R$ {250 + 40 * i}", "extracted_lowest": 250 + 40 * i},
+         "overall_rating": 4.1 + i / 10, "reviews": 800 + 150 * i, "gps_coordinates": {"latitude": 48.85, "longitude": 2.35}}
+        for i in range(5)
+    ]},
+    "google_images": {"images_results": [
+        {"original": f"https://upload.wikimedia.org/wikipedia/commons/thumb/4/4b/Paris_{i}.jpg/1280px-Paris_{i}.jpg"}
+        for i in range(3)
+    ]},
+}
+
+
+def count_tokens(text: str) -> int:
+    try:
+        from google.genai.local_tokenizer import LocalTokenizer
+        return LocalTokenizer(model_name="gemini-2.0-flash").count_tokens(text).total_tokens
+    except Exception:
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+# --- Formato antigo (reproduzido para comparação) ---
+
+def legacy_flights(data, origin, destination, date, return_date):
+    text = f"Opções de voos de {origin} para {destination} (Ida: {date}, Volta: {return_date}):\n"
+    for item in data["organic_results"][:3]:
+        text += f"- {item['title']}: {item['snippet']}\n"
+    text += f"\n🔗 **[Ver Passagens e Preços no Google Voos]({_build_flights_url(origin, destination, date, return_date)})**"
+    return text + "\n(O link acima já abre com as datas e locais preenchidos)"
+
+
+def legacy_hotels(data, city, check_in, check_out, budget):
+    text = f"Opções de hotéis em {city} (até R${budget}/noite, ordenados por preço):\n"
+    for item in data["properties"][:5]:
+        text += f"- {item['name']}\n  Preço: {item['rate_per_night']['lowest']} | Avaliação: {item['overall_rating']} ★\n"
+    text += f"\n🔗 **[Ver Hotéis e Reservar no Google Travel]({_build_hotels_url(city, check_in, check_out, budget)})**"
+    return text + "\n(Link com datas e filtros de preço já aplicados)"
+
+
+def legacy_recommendations(data, city, category):
+    text = f"Recomendações e Roteiros para {category} em {city}:\n"
+    for item in data["organic_results"][:4]:
+        text += f"- {item['title']}\n  '{item['snippet']}'\n  🔗 {item['link']}\n"
+    return text + f"\n🔗 **[Explorar Atrações no Mapa (Google Maps)]({_build_maps_url(city, category)})**"
+
+
+def legacy_images(data, query):
+    urls = [img["original"] for img in data["images_results"]]
+    return f"Imagens encontradas para '{query}' (use estas URLs no Markdown): " + ", ".join(urls)
+
+
+def legacy_weather(city):
+    return (f"Clima Histórico Médio para {city} (Período de 12-10 a 12-20):\n"
+            f"* 🌡️ Temperatura média: 6.8°C\n"
+            f"* ☔ Chance de Chuva: Moderada (3.4mm/dia). É uma boa ideia levar um guarda-chuva.\n"
+            f"(Média dos últimos 10 anos de dados climáticos.)\n\n"
+            f"🔗 **[Ver Previsão do Tempo em Tempo Real no Google]({_build_weather_url(city)})**")
+
+
+async def main():
+    os.environ.setdefault("SERPAPI_API_KEY", "benchmark")
+    loop = asyncio.get_running_loop()
+    http._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=FIXTURES[request.url.params["engine"]])
+    ))
+    current_links.set(LinkResolver())
+
+    weather = WeatherResult("Paris", "12-10", "12-20", 6.8, "moderada (3.4mm/dia)", 10,
+                            Link.make("weather", "Ver Previsão do Tempo", _build_weather_url("Paris")))
+    cases = [
+        ("voos", legacy_flights(FIXTURES["google"], "São Paulo", "Paris", "2025-12-10", "2025-12-20"),
+         await _search_flights.__wrapped__("São Paulo", "Paris", "2025-12-10", "2025-12-20")),
+        ("hotéis", legacy_hotels(FIXTURES["google_hotels"], "Paris", "2025-12-10", "2025-12-20", 450),
+         rank(await _search_hotels.__wrapped__("Paris", "2025-12-10", "2025-12-20", 450))),
+        ("recomendações", legacy_recommendations(FIXTURES["google"], "Paris", "atrações turísticas"),
+         await _search_recommendations.__wrapped__("Paris", "atrações turísticas")),
+        ("imagens", legacy_images(FIXTURES["google_images"], "Paris"),
+         await _search_images.__wrapped__("Paris")),
+        ("clima", legacy_weather("Paris"), weather),
+    ]
+
+    print(f"{'ferramenta':<15}{'antes':>8}{'depois':>8}{'redução':>10}")
+    total_before = total_after = 0
+    for name, legacy, result in cases:
+        before, after = count_tokens(legacy), count_tokens(render(result))
+        total_before += before
+        total_after += after
+        print(f"{name:<15}{before:>8}{after:>8}{1 - after / before:>10.0%}")
+    print(f"{'total':<15}{total_before:>8}{total_after:>8}{1 - total_after / total_before:>10.0%}")
+    await http.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
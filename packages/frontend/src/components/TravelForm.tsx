@@ -94,15 +94,23 @@ const TravelForm = ({
     const apiUrl = import.meta.env.VITE_API_URL || "http://localhost:8000";
     const token = localStorage.getItem("token"); // Pega o token salvo
 
+    let lastEventId: string | null = null;
+    let finished = false;
+    let retries = 0;
+
+    const requestPlan = () => fetch(`${apiUrl}/generate-plan`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "Authorization": `Bearer ${token}`, // Cabeçalho de Autorização!
+        // Na reconexão, o servidor continua o stream a partir do último evento recebido
+        ...(lastEventId ? { "Last-Event-ID": lastEventId } : {}),
+      },
+      body: JSON.stringify(data),
+    });
+
     try {
-      const response = await fetch(`${apiUrl}/generate-plan`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "Authorization": `Bearer ${token}` // Cabeçalho de Autorização!
-        },
-        body: JSON.stringify(data),
-      });
+      let response = await requestPlan();
 
       if (response.status === 401) {
         toast({ title: "Sessão Expirada", description: "Por favor, faça login novamente.", variant: "destructive" });
@@ -112,22 +120,68 @@ const TravelForm = ({
 
       if (!response.ok) {
         const errorData = await response.json();
-        throw new Error(errorData.error || "Falha na comunicação com o servidor");
+        // 429/503 (limite de planos ou servidor cheio) vêm com a mensagem em "detail"
+        throw new Error(errorData.detail || errorData.error || "Falha na comunicação com o servidor");
       }
 
       if (!response.body) {
         throw new Error("A resposta da API não continha um corpo.");
       }
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
+      // Lê os eventos SSE ("id:", "event:", "data:"); comentários (": ping") são ignorados
+      while (!finished) {
+        const reader = response.body!.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+
+        try {
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+              const rawEvent = buffer.slice(0, boundary);
+              buffer = buffer.slice(boundary + 2);
+
+              let eventType = "message";
+              const dataLines: string[] = [];
+              for (const line of rawEvent.split("\n")) {
+                if (line.startsWith("id: ")) {
+                  const eventId = line.slice(4);
+                  // Retomada recusada: o servidor começou um stream novo, o texto recomeça do zero
+                  if (lastEventId && eventId.split(":")[0] !== lastEventId.split(":")[0]) fullPlan = "";
+                  lastEventId = eventId;
+                }
+                else if (line.startsWith("event: ")) eventType = line.slice(7);
+                else if (line.startsWith("data: ")) dataLines.push(line.slice(6));
+              }
+
+              if (eventType === "done") {
+                finished = true;
+              } else if (dataLines.length) {
+                fullPlan += dataLines.join("\n");
+                setTravelPlan(fullPlan);
+              }
+            }
+          }
+        } catch (streamError) {
+          console.warn("Conexão interrompida durante o stream:", streamError);
+        }
 
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-        const chunk = decoder.decode(value);
-        fullPlan += chunk;
-        setTravelPlan(fullPlan);
+        if (finished) break;
+        // A conexão caiu antes do fim: tenta retomar algumas vezes
+        if (!lastEventId || retries >= 3) {
+          throw new Error("A conexão com o servidor foi interrompida.");
+        }
+        retries += 1;
+        response = await requestPlan();
+        if (!response.ok || !response.body) {
+          // 409: os eventos perdidos já saíram do buffer do servidor, é preciso gerar de novo
+          const errorData = await response.json().catch(() => ({}));
+          throw new Error(errorData.detail || "Falha ao retomar o plano.");
+        }
       }
 
       onPlanGenerated(fullPlan, data); 
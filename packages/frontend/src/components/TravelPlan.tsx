@@ -46,19 +46,31 @@ const TravelPlan = ({ plan, isLoading, destination }: TravelPlanProps) => {
 
     try {
       const apiUrl = import.meta.env.VITE_API_URL || "http://localhost:8000";
-      const response = await fetch(`${apiUrl}/download-plan`, {
+      const token = localStorage.getItem("token");
+      const exportPlan = (format: string) => fetch(`${apiUrl}/download-plan?format=${format}`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          "Authorization": `Bearer ${token}`,
+        },
         body: JSON.stringify({ plan: plan }) 
       });
 
+      // Sem o motor de PDF no servidor (503), baixa a versão HTML do plano
+      let format = "pdf";
+      let response = await exportPlan(format);
+      if (response.status === 503) {
+        format = "html";
+        response = await exportPlan(format);
+      }
+
       if (!response.ok) throw new Error("Falha ao gerar o PDF");
 
       const blob = await response.blob();
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = `Viagem-${destination || 'Plano'}.pdf`;
+      a.download = `Viagem-${destination || 'Plano'}.${format}`;
       document.body.appendChild(a);
       a.click();
       a.remove();